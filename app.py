@@ -1,156 +1,670 @@
 from flask import Flask, render_template,request,jsonify, redirect, url_for
+from flask.globals import request_ctx
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup, escape
+from asgiref.sync import sync_to_async
+import asyncio
+import os
+import re
+import click
 import requests
-import PyPDF2
 
+from ayah_index import build_index, get_index, parse_query
+from hadith import get_hadith_index
+from fragment_cache import FragmentCacheExtension, fragments as fragment_cache
+from freeze import freeze
+from hadith_search import hadith_search
+from highlight import MARK_END, MARK_START, mark, term_pattern
+from page_cache import cached_page, pages as page_cache, skip as skip_page_cache, timestamp
+from pdf_text import pdf_cache
+from quran_client import api as quran_api, client as quran_client
+from surahs import SURAH_COUNT, SurahTable, api_table, bundled_table, share_api_table, write_snapshot
+from quran_store import (ARABIC_EDITION, IngestError, TRANSLATION_EDITION, TRANSLATION_NAME, fetch_editions,
+                         get_store, ingest, load_fixture, reset_store)
+from utils import env_int
 
-app = Flask(__name__)
-app.config['TEMPLATES_AUTO_RELOAD'] = True
-app.jinja_env.cache = {}
 
-def extract_text_from_pdf(pdf_path):
-    text = ""
+def template_bytecode_cache(directory):
+    # Falls back to Jinja's per-user temp directory where the app's own data
+    # directory is read-only, as on serverless hosts
     try:
-        with open(pdf_path, 'rb') as pdf_file:
-            reader = PyPDF2.PdfReader(pdf_file)
-            for page in reader.pages:
-                text += page.extract_text()
-    except Exception as e:
-        print(f"Error reading PDF: {e}")
-    return text
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        return FileSystemBytecodeCache()
+    if not os.access(directory, os.W_OK):
+        return FileSystemBytecodeCache()
+    return FileSystemBytecodeCache(directory)
+
+
+def compile_templates():
+    # Loads every template into the environment's cache: straight from the
+    # bytecode cache when it is warm, compiled (and stored there) otherwise
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+
+app = Flask(__name__)
+# APP_ENV=production turns template auto-reload off, keeps compiled templates
+# in a bytecode cache across restarts and compiles them all at startup;
+# anything else is development mode with hot reload.
+app.config['PRODUCTION'] = os.environ.get('APP_ENV', 'development') == 'production'
+app.config['TEMPLATES_AUTO_RELOAD'] = not app.config['PRODUCTION']
+app.config['TEMPLATE_CACHE_DIR'] = os.environ.get(
+    'TEMPLATE_CACHE_DIR', os.path.join(app.root_path, 'data', 'jinja_cache'))
+if app.config['PRODUCTION']:
+    app.jinja_options = dict(app.jinja_options,
+                             bytecode_cache=template_bytecode_cache(app.config['TEMPLATE_CACHE_DIR']))
+# {% cache key, version %} ... {% endcache %} for fragments shared by all users
+app.jinja_env.add_extension(FragmentCacheExtension)
+# 'fts' searches the SQLite FTS5 index, 'index' the in-memory inverted index
+app.config['SEARCH_ENGINE'] = os.environ.get('QURAN_SEARCH_ENGINE', 'fts')
+# Large pages are streamed, flushed every STREAM_BUFFER template chunks
+app.config['STREAM_PAGES'] = os.environ.get('STREAM_PAGES', '1') != '0'
+app.config['STREAM_BUFFER'] = env_int('STREAM_BUFFER', 32)
+# Whole-page cache with ETag/304 for the Quran and hadith pages
+app.config['PAGE_CACHE'] = os.environ.get('PAGE_CACHE', '1') != '0'
+
+# Hadith collection PDFs by route name
+HADITH_COLLECTIONS = {
+    'bukhari': "static/pdfs/bukhari.pdf",
+    'muslim': "static/pdfs/muslim.pdf",
+    'tirmidhi': "static/pdfs/tirmidhi.pdf",
+}
+# Translations a surah page may show side by side (?editions=en.sahih,ur.jalandhry)
+EDITION_ID = re.compile(r'^[a-z]{2,3}\.[a-z0-9-]+$')
+MAX_EDITIONS = 4
+
+HADITH_TITLES = {
+    'bukhari': "Sahih Al Bukhari",
+    'muslim': "Sahih Muslim",
+    'tirmidhi': "Jami At-Tirmidhi",
+}
+
+def render_streamed(template_name, **context):
+    # Sends the layout and the first rows as soon as they are rendered instead
+    # of building the whole page in memory; falls back to render_template when
+    # STREAM_PAGES is off. Errors must be raised before this is called, since
+    # the status line goes out with the first chunk.
+    if not app.config['STREAM_PAGES']:
+        return render_template(template_name, **context)
+    template = app.jinja_env.get_or_select_template(template_name)
+    app.update_template_context(context)
+    stream = template.stream(context)
+    stream.enable_buffering(app.config['STREAM_BUFFER'])
+    return app.response_class(with_request_context(request_ctx.copy(), stream),
+                              mimetype='text/html')
+
+
+def with_request_context(ctx, chunks):
+    # Like stream_with_context, but the context is only pushed once the server
+    # starts reading, so it also works for responses returned by async views
+    with ctx:
+        yield from chunks
+
+
+def in_request_thread(fn, *args, **kwargs):
+    # Async views run on an event loop in a thread of their own. Store reads
+    # are sent back to the thread serving the request, which owns the SQLite
+    # connection and later reads any lazy result while streaming.
+    return sync_to_async(fn)(*args, **kwargs)
+
+
+def quran_version(**kwargs):
+    # Quran pages only change when new data is ingested
+    store = get_store()
+    if store is None:
+        return 'api', None
+    return store.version, timestamp(store.ingested_at)
+
+
+def hadith_version(name):
+    # Hadith pages only change with the collection's PDF
+    def version(**kwargs):
+        meta = pdf_cache.meta(HADITH_COLLECTIONS[name])
+        if meta is None:
+            return None
+        return meta['sha256'], timestamp(meta['mtime_ns'] / 1e9)
+    return version
+
+
 def get_quran_data(endpoint, params=None):
-    base_url = "https://api.alquran.cloud/v1/"
-    try:
-        response = requests.get(base_url + endpoint, params=params)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error calling API: {e}")
-        return None
+    # Served from cache when possible, stale while refreshing, and None while
+    # a recent upstream failure for the same call is still remembered.
+    return quran_api.get(endpoint, params=params)
 
 
-@app.route('/search')
-def search_quran():
-    query = request.args.get('q', '').strip()
-    
-    if not query:
-        return render_template('search.html', error="Please enter a search term")
-    
-    # Make the API search request
+async def fetch_quran_data(endpoint, params=None):
+    # get_quran_data for async views: a miss is awaited, not blocking
+    return await quran_api.get_async(endpoint, params=params)
+
+
+async def get_surah_table():
+    # The immutable surah table: the store's when there is one, then the one
+    # bundled by snapshot-surahs, and only then built once from the API
+    store = get_store()
+    if store is not None:
+        return store.surah_table
+    table = bundled_table() or api_table()
+    if table is None:
+        data = await fetch_quran_data("surah")
+        if data and data.get('data'):
+            table = share_api_table(data['data'])
+    return table
+
+
+def parse_editions(value):
+    # Valid, distinct edition identifiers from a comma separated list
+    editions = []
+    for edition in value.split(','):
+        edition = edition.strip().lower()
+        if EDITION_ID.match(edition) and edition not in editions:
+            editions.append(edition)
+    return editions[:MAX_EDITIONS]
+
+
+def editions_arg(args):
+    # The part of a surah page's query string the page cache keys on
+    return tuple(parse_editions(args.get('editions', '')))
+
+
+def page_arg(args):
+    # Hadith pages used to be addressed as ?page=N
+    return args.get('page', 1, type=int)
+
+
+async def fetch_surah_editions(surah_number, editions):
+    # Every edition in one upstream call; returns {identifier: surah data}
+    if not editions:
+        return {}
+    data = await fetch_quran_data(f"surah/{surah_number}/editions/{','.join(editions)}")
+    if not data or not isinstance(data.get('data'), list):
+        return {}
+    return {e['edition']['identifier']: e for e in data['data'] if e.get('edition')}
+
+
+def join_editions(ayahs, editions, fetched, local):
+    # Yields copies of the ayahs with each edition's text attached by
+    # position, in a single pass; the ayahs themselves may be shared cache
+    # entries and are never written to. With ``local`` the ayahs' own
+    # translation is used for TRANSLATION_EDITION; editions that could not be
+    # fetched are left out.
+    columns = []
+    for edition in editions:
+        if edition in fetched:
+            info = fetched[edition]['edition']
+            columns.append((info.get('englishName', edition), info.get('direction') or 'ltr',
+                            fetched[edition]['ayahs']))
+        elif local and edition == TRANSLATION_EDITION:
+            columns.append((TRANSLATION_NAME, 'ltr', None))
+    for i, ayah in enumerate(ayahs):
+        yield dict(ayah, translations=[
+            {'name': name, 'direction': direction,
+             'text': texts[i]['text'] if texts is not None else ayah.get('translation', '')}
+            for name, direction, texts in columns
+            if texts is None or i < len(texts)
+        ])
+
+
+def get_ayah_range(surah_number, start, end):
+    # Returns (surah, status): the surah's metadata carrying only ayahs
+    # start..end, or None and the status to answer with
+    store = get_store()
+    if store is not None:
+        surah = store.surah_info(surah_number)
+        ayahs = store.ayahs(surah_number, start, end) if surah else None
+        if not ayahs:
+            return None, 404
+        surah['ayahs'] = ayahs
+        return surah, 200
+    if not 1 <= start <= end:
+        return None, 404
+    data = get_quran_data(f"surah/{surah_number}/en.sahih",
+                          params={'offset': start - 1, 'limit': end - start + 1})
+    if not data or not data.get('data'):
+        return None, 500
+    if not data['data'].get('ayahs'):
+        return None, 404
+    return data['data'], 200
+
+
+def query_pattern(query):
+    # One regex for all of the query's terms, tokenized as the index does
+    return term_pattern(term for group in parse_query(query) for term in group)
+
+
+def search_store(store, query, surah, offset, limit):
+    if app.config['SEARCH_ENGINE'] == 'index':
+        hits = get_index(store).search(query, surah=surah)
+        results = store.results(hits[offset:offset + limit])
+        pattern = query_pattern(query)
+        for result in results:
+            result['marked'] = mark(result['translation'], pattern)
+        return len(hits), results
+    return store.search(query, surah=surah, offset=offset, limit=limit)
+
+
+async def search_ayahs(query, surah, offset, limit):
+    # Returns (total, results) with results already shaped for search.html
+    store = get_store()
+    if store is not None:
+        return await in_request_thread(search_store, store, query, surah, offset, limit)
+
     search_params = {
         'q': query,
         'language': 'en',
-        'surah': request.args.get('surah', ''),
-        'offset': request.args.get('offset', 0),
-        'limit': 20  # Limit results per page
+        'surah': surah or '',
+        'offset': offset,
+        'limit': limit
     }
-    
-    search_data = get_quran_data("search", params=search_params)
-    
+    # Surah names come from the shared table; it is only fetched, alongside
+    # the search, when no request has loaded it yet
+    search_data, surahs = await asyncio.gather(
+        fetch_quran_data("search", params=search_params), get_surah_table())
     if not search_data or not search_data.get('data'):
-        return render_template('search.html', 
-                           error="No results found",
-                           query=query)
-    
-    # Get surah names for display
-    surahs_data = get_quran_data("surah")
-    surahs_map = {s['number']: s for s in surahs_data['data']} if surahs_data else {}
+        return 0, []
     
     # Process search results
     results = []
+    pattern = query_pattern(query)
     for match in search_data['data']['matches']:
         surah_num = match['surah']['number']
-        surah_info = surahs_map.get(surah_num, {})
+        surah_info = surahs.get(surah_num) if surahs else None
+        # With language=en the matched English text is the match's 'text';
+        # the search response carries no Arabic
+        translation = match.get('text', '')
         
         results.append({
-            'text': match['text'],
-            'translation': match['translation'],
+            'text': '',
+            'translation': translation,
+            'marked': mark(translation, pattern),
             'surah_number': surah_num,
-            'surah_name': surah_info.get('englishName', ''),
-            'surah_name_arabic': surah_info.get('name', ''),
+            'surah_name': surah_info.englishName if surah_info else '',
+            'surah_name_arabic': surah_info.name if surah_info else '',
             'ayah_number': match['numberInSurah']
         })
+    return search_data['data']['total'], results
+
+
+@app.route('/search')
+async def search_quran():
+    query = request.args.get('q', '').strip()
+    
+    if not query:
+        return render_template('search.html', error="Please enter a search term")
+    
+    # Only a surah in the table filters the search; the table is shared and
+    # usually already loaded, so it is read before the search, not alongside
+    surahs = await get_surah_table()
+    surah = request.args.get('surah', type=int)
+    if not (surah and surahs and surahs.get(surah)):
+        surah = None
+    offset = max(request.args.get('offset', 0, type=int) or 0, 0)
+    limit = 20  # Limit results per page
+
+    total, results = await search_ayahs(query, surah, offset, limit)
+    
+    if not results:
+        return render_template('search.html', 
+                           error="No results found",
+                           query=query)
     
     # Pagination info
     pagination = {
-        'total': search_data['data']['total'],
-        'current_page': int(request.args.get('offset', 0)) // 20 + 1,
-        'total_pages': (search_data['data']['total'] + 19) // 20,
-        'has_next': search_data['data']['total'] > (int(request.args.get('offset', 0)) + 20),
-        'has_prev': int(request.args.get('offset', 0)) > 0
+        'total': total,
+        'current_page': offset // limit + 1,
+        'total_pages': (total + limit - 1) // limit,
+        'has_next': total > offset + limit,
+        'has_prev': offset > 0
     }
     
     return render_template('search.html',
                          results=results,
                          query=query,
                          pagination=pagination,
-                         surahs=surah_data['data'] if surahs_data else [])
+                         surahs=surahs or [],
+                         selected_surah=surah)
+
+def render_hadith_page(name, template, page):
+    # One PDF page per view, read straight from the page-indexed text cache.
+    # Pages have path URLs (/bukhari/page/3) so a frozen copy can serve them.
+    if page_arg(request.args) != 1:
+        return redirect(url_for(name, page=page_arg(request.args)), 301)
+    pdf_path = HADITH_COLLECTIONS[name]
+    total_pages = pdf_cache.page_count(pdf_path)
+    if not total_pages:
+        return "Error extracting text from the PDF", 500
+
+    pdf_text = pdf_cache.page(pdf_path, page)
+    if pdf_text is None:
+        return "Page not found", 404
+
+    pagination = {
+        'endpoint': name,
+        'current_page': page,
+        'total_pages': total_pages,
+        'has_prev': page > 1,
+        'has_next': page < total_pages
+    }
+    return render_streamed(template, pdf_text=pdf_text, pagination=pagination)
+
+def render_hadith(name, number, book=None):
+    # A single hadith record, looked up by number in the segmented collection,
+    # or by its printed book and number
+    pdf_path = HADITH_COLLECTIONS[name]
+    index = get_hadith_index(pdf_cache, pdf_path)
+    if index is None:
+        return "Error extracting text from the PDF", 500
+    row = index.find(number) if book is None else index.find_reference(book, number)
+    if row is None:
+        return "Hadith not found", 404
+
+    hadith = index.record(row)
+    hadith['text'] = index.read(row, pdf_cache.buffer(pdf_path))
+    neighbours = {
+        'prev': index.numbers[row - 1] if row > 0 else None,
+        'next': index.numbers[row + 1] if row + 1 < len(index) else None
+    }
+    return render_template('hadith.html',
+                         collection=name,
+                         title=HADITH_TITLES[name],
+                         hadith=hadith,
+                         neighbours=neighbours)
+
+@app.template_filter('marked')
+def marked(snippet):
+    # Escape the snippet first, then turn the search engine's match markers
+    # into highlight spans
+    html = str(escape(snippet))
+    html = html.replace(MARK_START, '<span class="highlight">').replace(MARK_END, '</span>')
+    return Markup(html)
+
+
+@app.route('/hadith/search')
+def search_hadith():
+    query = request.args.get('q', '').strip()
+    collection = request.args.get('collection', '')
+    if collection not in HADITH_COLLECTIONS:
+        collection = ''
+
+    if not query:
+        return render_template('hadith_search.html', error="Please enter a search term",
+                               titles=HADITH_TITLES, collection=collection)
+
+    offset = max(request.args.get('offset', 0, type=int) or 0, 0)
+    limit = 20  # Limit results per page
+
+    # Searches the index as it is; a changed PDF is re-indexed in the background
+    hadith_search.refresh(HADITH_COLLECTIONS, pdf_cache)
+    total, results = hadith_search.search(query, collection=collection or None,
+                                          offset=offset, limit=limit)
+    if not results:
+        return render_template('hadith_search.html', error="No results found",
+                               query=query, titles=HADITH_TITLES, collection=collection)
+
+    pagination = {
+        'total': total,
+        'current_page': offset // limit + 1,
+        'total_pages': (total + limit - 1) // limit,
+        'has_next': total > offset + limit,
+        'has_prev': offset > 0,
+        'limit': limit
+    }
+    return render_template('hadith_search.html',
+                         results=results,
+                         query=query,
+                         pagination=pagination,
+                         titles=HADITH_TITLES,
+                         collection=collection)
 
 # Route to get all surahs (for dropdown)
 @app.route('/api/surahs')
-def get_surahs():
-    surahs_data = get_quran_data("surah")
-    return jsonify(surahs_data['data']) if surahs_data else jsonify([])
+async def get_surahs():
+    surahs = await get_surah_table()
+    return jsonify(surahs.as_dicts() if surahs else [])
+# Upstream client and response cache metrics
+@app.route('/api/stats')
+def stats():
+    return jsonify(dict(quran_api.stats(), pages=page_cache.stats(),
+                        fragments=fragment_cache.stats()))
 @app.route('/')
-def home():
+@cached_page(quran_version)
+async def home():
     # Get list of all surahs
-    data = get_quran_data("surah")
-    if data and data.get('data'):
-        return render_template('index.html', surahs=data['data'],)
+    surahs = await get_surah_table()
+    if surahs:
+        return render_template('index.html', surahs=surahs)
     return "Error fetching Surah list", 500
 
 
 
-@app.route('/bukhari')
-def bukhari():
-    # Path to the PDF file
-    pdf_path = "static/pdfs/bukhari.pdf"
-    
-    # Extract text from the PDF
-    pdf_text = extract_text_from_pdf(pdf_path)
-    
-    if not pdf_text:
-        return "Error extracting text from the PDF", 500
-    
-    # Render the text in an HTML template
-    return render_template('bukhari.html', pdf_text=pdf_text)
+@app.route('/bukhari', defaults={'page': 1})
+@app.route('/bukhari/page/<int:page>')
+@cached_page(hadith_version('bukhari'), query=page_arg)
+def bukhari(page):
+    return render_hadith_page('bukhari', 'bukhari.html', page)
 
 
-@app.route('/tirmidhi')
-def tirmidhi():
-    # Path to the PDF file
-    pdf_path = "static/pdfs/tirmidhi.pdf"
-    
-    # Extract text from the PDF
-    pdf_text = extract_text_from_pdf(pdf_path)
-    
-    if not pdf_text:
-        return "Error extracting text from the PDF", 500
-    
-    # Render the text in an HTML template
-    return render_template('tirmidhi.html', pdf_text=pdf_text)
+@app.route('/bukhari/<int:number>')
+@cached_page(hadith_version('bukhari'))
+def bukhari_hadith(number):
+    return render_hadith('bukhari', number)
+
+
+@app.route('/bukhari/<int:book>/<int:number>')
+@cached_page(hadith_version('bukhari'))
+def bukhari_reference(book, number):
+    return render_hadith('bukhari', number, book=book)
+
+
+@app.route('/tirmidhi', defaults={'page': 1})
+@app.route('/tirmidhi/page/<int:page>')
+@cached_page(hadith_version('tirmidhi'), query=page_arg)
+def tirmidhi(page):
+    return render_hadith_page('tirmidhi', 'tirmidhi.html', page)
+
+
+@app.route('/tirmidhi/<int:number>')
+@cached_page(hadith_version('tirmidhi'))
+def tirmidhi_hadith(number):
+    return render_hadith('tirmidhi', number)
+
+
+@app.route('/tirmidhi/<int:book>/<int:number>')
+@cached_page(hadith_version('tirmidhi'))
+def tirmidhi_reference(book, number):
+    return render_hadith('tirmidhi', number, book=book)
 
 
 @app.route('/surah/<int:surah_number>')
-def get_surah(surah_number):
-    data = get_quran_data(f"surah/{surah_number}/en.sahih")
-    if data and data.get('data'):
-        return render_template('surah.html', surah=data['data'])
-    return "Error fetching Surah data", 500
+@cached_page(quran_version, query=editions_arg)
+async def get_surah(surah_number):
+    editions = parse_editions(request.args.get('editions', ''))
+    store = get_store()
+    # The store already holds TRANSLATION_EDITION; anything else is fetched,
+    # together with the Arabic text when there is no store, in one call
+    remote = [e for e in editions if store is None or e != TRANSLATION_EDITION]
+    if store is not None:
+        # Lazy ayahs are only read by the request thread when the page is
+        # streamed; a page rendered whole is rendered on the event loop thread
+        fetched, surah = await asyncio.gather(
+            fetch_surah_editions(surah_number, remote),
+            in_request_thread(store.surah, surah_number, lazy=app.config['STREAM_PAGES']))
+        if surah is None:
+            return "Surah not found", 404
+    elif remote:
+        fetched = await fetch_surah_editions(surah_number, [ARABIC_EDITION] + remote)
+        surah = fetched.get(ARABIC_EDITION)
+    else:
+        fetched, surah = {}, None
+    if surah is None:
+        data = await fetch_quran_data(f"surah/{surah_number}/en.sahih")
+        if not data or not data.get('data'):
+            return "Error fetching Surah data", 500
+        surah = data['data']
+    if editions:
+        surah = dict(surah, ayahs=join_editions(surah['ayahs'], editions, fetched,
+                                                local=store is not None))
+    if any(e not in fetched for e in remote):
+        skip_page_cache()
+    return render_streamed('surah.html', surah=surah,
+                           missing_editions=[e for e in remote if e not in fetched])
 
 
-@app.route('/muslim')
-def muslim():
-    # Path to the PDF file
-    pdf_path = "static/pdfs/muslim.pdf"
-    
-    # Extract text from the PDF
-    pdf_text = extract_text_from_pdf(pdf_path)
-    
-    if not pdf_text:
-        return "Error extracting text from the PDF", 500
-    
-    # Render the text in an HTML template
-    return render_template('muslim.html', pdf_text=pdf_text)
+@app.route('/surah/<int:surah_number>/<int:start>-<int:end>')
+def get_surah_range(surah_number, start, end):
+    surah, status = get_ayah_range(surah_number, start, end)
+    if surah is None:
+        return ("Ayahs not found", 404) if status == 404 else ("Error fetching Surah data", 500)
+    return render_template('surah.html', surah=surah, partial=True)
+
+
+@app.route('/ayah/<int:surah_number>:<int:ayah_number>')
+def get_ayah(surah_number, ayah_number):
+    return get_surah_range(surah_number, ayah_number, ayah_number)
+
+
+@app.route('/api/surah/<int:surah_number>/<int:start>-<int:end>')
+def api_surah_range(surah_number, start, end):
+    surah, status = get_ayah_range(surah_number, start, end)
+    if surah is None:
+        return jsonify({'error': "Ayahs not found" if status == 404 else "Error fetching Surah data"}), status
+    return jsonify(surah)
+
+
+@app.route('/api/ayah/<int:surah_number>:<int:ayah_number>')
+def api_ayah(surah_number, ayah_number):
+    return api_surah_range(surah_number, ayah_number, ayah_number)
+
+
+@app.route('/muslim', defaults={'page': 1})
+@app.route('/muslim/page/<int:page>')
+@cached_page(hadith_version('muslim'), query=page_arg)
+def muslim(page):
+    return render_hadith_page('muslim', 'muslim.html', page)
+
+
+@app.route('/muslim/<int:number>')
+@cached_page(hadith_version('muslim'))
+def muslim_hadith(number):
+    return render_hadith('muslim', number)
+
+
+@app.route('/muslim/<int:book>/<int:number>')
+@cached_page(hadith_version('muslim'))
+def muslim_reference(book, number):
+    return render_hadith('muslim', number, book=book)
+
+
+@app.cli.command('ingest-quran')
+@click.option('--fixture', type=click.Path(exists=True, dir_okay=False),
+              help='Load editions from a local JSON file instead of the API.')
+def ingest_quran(fixture):
+    """Download the Quran text into the local store."""
+    try:
+        editions = load_fixture(fixture) if fixture else fetch_editions(quran_client)
+        surahs, ayahs = ingest(editions)
+    except (IngestError, requests.exceptions.RequestException, KeyError, ValueError) as e:
+        raise click.ClickException(f"Ingest failed: {e}")
+    reset_store()
+    build_index(get_store())
+    click.echo(f"Stored {surahs} surahs and {ayahs} ayahs")
+
+
+@app.cli.command('snapshot-surahs')
+def snapshot_surahs():
+    """Bundle the surah list into surah_meta.py for zero-I/O startup."""
+    store = get_store()
+    if store is not None:
+        table = store.surah_table
+    else:
+        data = get_quran_data("surah")
+        if not data or not data.get('data'):
+            raise click.ClickException("Could not fetch the surah list")
+        table = SurahTable.from_dicts(data['data'], "api")
+    if len(table) != SURAH_COUNT:
+        raise click.ClickException(
+            f"Found {len(table)} surahs instead of {SURAH_COUNT}; ingest the full Quran first")
+    write_snapshot(table)
+    click.echo(f"Wrote {len(table)} surahs to surah_meta.py")
+
+
+def frozen_pages(store):
+    # Every page freeze pre-renders, as (url, template, data version)
+    yield '/', 'index.html', store.version
+    for surah in store.surah_table:
+        yield f'/surah/{surah.number}', 'surah.html', store.version
+    for name, pdf_path in HADITH_COLLECTIONS.items():
+        if not os.path.exists(pdf_path):
+            continue
+        meta = pdf_cache.meta(pdf_path)
+        if meta is None:
+            continue
+        yield f'/{name}', f'{name}.html', meta['sha256']
+        for page in range(2, pdf_cache.page_count(pdf_path) + 1):
+            yield f'/{name}/page/{page}', f'{name}.html', meta['sha256']
+        for number in get_hadith_index(pdf_cache, pdf_path).numbers:
+            yield f'/{name}/{number}', 'hadith.html', meta['sha256']
+
+
+@app.cli.command('freeze')
+@click.option('--output', type=click.Path(file_okay=False), default='build', show_default=True,
+              help='Directory the static site is written to.')
+@click.option('--workers', type=int, default=os.cpu_count() or 1, show_default=True,
+              help='Processes used to render pages.')
+@click.option('--force', is_flag=True, help='Render every page, changed or not.')
+def freeze_site(output, workers, force):
+    """Pre-render the home, surah and hadith pages into static files."""
+    store = get_store()
+    if store is None:
+        raise click.ClickException("No local store; run ingest-quran first")
+
+    def progress(done, total):
+        click.echo(f"\r{done}/{total} pages rendered", nl=False)
+
+    rendered, unchanged, removed, failed = freeze(
+        app, frozen_pages(store), output, workers=workers, force=force, progress=progress)
+    click.echo(f"\r{rendered} pages rendered, {unchanged} unchanged, {removed} removed")
+    for url, status in failed:
+        click.echo(f"{url}: HTTP {status}")
+
+
+@app.cli.command('warm-hadith')
+@click.option('--workers', type=int, default=os.cpu_count() or 1, show_default=True,
+              help='Processes used to extract pages.')
+@click.argument('collections', nargs=-1)
+def warm_hadith(workers, collections):
+    """Extract and cache the hadith PDFs so no request has to."""
+    for name in collections or HADITH_COLLECTIONS:
+        if name not in HADITH_COLLECTIONS:
+            raise click.BadParameter(f"unknown collection '{name}'", param_hint='COLLECTIONS')
+        pdf_path = HADITH_COLLECTIONS[name]
+
+        def progress(done, total, name=name):
+            click.echo(f"\r{name}: {done}/{total} pages", nl=False)
+
+        meta = pdf_cache.meta(pdf_path, workers=workers, progress=progress)
+        if meta is None:
+            click.echo(f"\r{name}: no text extracted from {pdf_path}")
+            continue
+        index = get_hadith_index(pdf_cache, pdf_path)
+        click.echo(f"\r{name}: {len(meta['offsets']) - 1} pages cached, "
+                   f"{len(index)} hadith ({index.numbering} numbering)")
+    hadith_search.sync(HADITH_COLLECTIONS, pdf_cache)
+    click.echo("Hadith search index up to date")
+
+
+@app.cli.command('compile-templates')
+def compile_templates_command():
+    """Fill the template bytecode cache, e.g. as a build step."""
+    if not app.config['PRODUCTION']:
+        raise click.ClickException("Only needed with APP_ENV=production")
+    compile_templates()
+    click.echo(f"Compiled {len(app.jinja_env.list_templates())} templates")
+
+
+# Compiled once per worker at startup rather than on the first request
+if app.config['PRODUCTION']:
+    compile_templates()
 
 
 if __name__ == '__main__':
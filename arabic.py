@@ -0,0 +1,56 @@
+"""Text normalization and tokenization shared by indexing and querying.
+
+Arabic text is reduced to a plain, undecorated form so that a query typed on
+an ordinary keyboard matches the Uthmani script of the corpus:
+
+- tashkeel (harakat, tanween, shadda, sukun) and Quranic annotation marks
+  are removed, as is tatweel;
+- alef forms (hamza above/below, madda, wasla) become a bare alef, and the
+  superscript (dagger) alef is dropped;
+- ta marbuta becomes ha, alef maksura becomes ya, hamza on waw/ya becomes the
+  bare letter, and the small waw/ya of the Uthmani script are dropped.
+
+Latin text is lowercased. Everything is done with one precompiled
+``str.translate`` table; pure-ASCII strings (the English translation) skip
+the table entirely.
+"""
+import re
+
+
+def _table():
+    table = {}
+    # Tashkeel, Quranic marks and tatweel
+    for start, end in ((0x0610, 0x061A), (0x064B, 0x065F), (0x06D6, 0x06DC),
+                       (0x06DF, 0x06E8), (0x06EA, 0x06ED), (0x08D3, 0x08FF)):
+        for code in range(start, end + 1):
+            table[code] = None
+    table[0x0640] = None  # tatweel
+    table[0x0670] = None  # superscript alef
+    # Letter variants
+    for code in (0x0622, 0x0623, 0x0625, 0x0671, 0x0672, 0x0673):
+        table[code] = "ا"  # alef
+    table[0x0629] = "ه"  # ta marbuta -> ha
+    table[0x0649] = "ي"  # alef maksura -> ya
+    table[0x06CC] = "ي"  # farsi ya -> ya
+    table[0x0624] = "و"  # waw with hamza -> waw
+    table[0x0626] = "ي"  # ya with hamza -> ya
+    # Uthmani spacing characters that read as a word break
+    table[0x06DD] = " "
+    table[0x06DE] = " "
+    table[0x06E9] = " "
+    return table
+
+
+TABLE = str.maketrans(_table())
+
+_TOKEN = re.compile(r"\w+")
+
+
+def normalize(text):
+    if text.isascii():
+        return text.lower()
+    return text.translate(TABLE).lower()
+
+
+def tokenize(text):
+    return _TOKEN.findall(normalize(text))
@@ -0,0 +1,217 @@
+"""In-memory inverted index over the ayahs of the local store.
+
+Every term maps to a sorted posting list of ayah numbers. All posting lists
+live back to back in one ``array('I')``; a term only records where its slice
+starts and ends, so the whole index is a few hundred kilobytes and loads from
+a snapshot with a single ``frombytes``.
+"""
+import os
+import pickle
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+
+import arabic
+from utils import atomic_file
+
+
+SNAPSHOT_FORMAT = 2
+
+
+def parse_query(query):
+    """Split a query into OR-groups of AND-ed terms.
+
+    ``"mercy lord OR refuge"`` becomes ``[["mercy", "lord"], ["refuge"]]``.
+    """
+    groups = [[]]
+    for word in query.split():
+        if word == "OR":
+            if groups[-1]:
+                groups.append([])
+            continue
+        groups[-1].extend(arabic.tokenize(word))
+    return [group for group in groups if group]
+
+
+def _gallop(postings, target, lo):
+    # Exponential probe from lo, then binary search inside the bracket.
+    n = len(postings)
+    step = 1
+    while lo + step < n and postings[lo + step] < target:
+        step <<= 1
+    return bisect_left(postings, target, lo + (step >> 1), min(lo + step + 1, n))
+
+
+# Below this length ratio a C-level set intersection beats walking the short
+# list in Python, so galloping is only used for skewed pairs.
+GALLOP_RATIO = 16
+
+
+def _gallop_intersect(short, long):
+    matched = []
+    pos = 0
+    n = len(long)
+    for ayah in short:
+        pos = _gallop(long, ayah, pos)
+        if pos >= n:
+            break
+        if long[pos] == ayah:
+            matched.append(ayah)
+    return matched
+
+
+def intersect(lists):
+    """Intersect sorted posting lists, shortest first.
+
+    A single list is returned as is (it may be a memoryview).
+    """
+    if not lists:
+        return []
+    lists = sorted(lists, key=len)
+    result = lists[0]
+    for other in lists[1:]:
+        if not result:
+            return []
+        if len(other) >= GALLOP_RATIO * len(result):
+            result = _gallop_intersect(result, other)
+        else:
+            result = sorted(set(result).intersection(other))
+    return result
+
+
+class AyahIndex:
+    def __init__(self, version, terms, postings, surah_starts):
+        self.version = version
+        self._terms = terms
+        self._postings = memoryview(postings)
+        self._buffer = postings
+        self.surah_starts = surah_starts
+
+    @classmethod
+    def build(cls, rows, version=""):
+        """Index ``(number, surah, text, translation)`` rows in ayah order."""
+        rows = list(rows)
+        texts = [arabic.tokenize(row[2]) for row in rows]
+        translations = [arabic.tokenize(row[3]) for row in rows]
+        lists = {}
+        firsts = {}
+        last = 0
+        for (number, surah, _, _), text, translation in zip(rows, texts, translations):
+            firsts.setdefault(surah, number)
+            last = number
+            for term in set(text).union(translation):
+                postings = lists.get(term)
+                if postings is None:
+                    lists[sys.intern(term)] = postings = []
+                postings.append(number)
+        terms = {}
+        buffer = array("I")
+        for term in sorted(lists):
+            start = len(buffer)
+            buffer.extend(lists[term])
+            terms[term] = (start, len(buffer))
+        # surah_starts[s] is the first ayah number of surah s and
+        # surah_starts[s + 1] the end of its range; absent surahs are empty.
+        top = max(firsts, default=0)
+        surah_starts = array("I", [0] * (top + 2))
+        surah_starts[top + 1] = last + 1
+        for surah in range(top, 0, -1):
+            surah_starts[surah] = firsts.get(surah, surah_starts[surah + 1])
+        return cls(version, terms, buffer, surah_starts)
+
+    def postings(self, term):
+        span = self._terms.get(term)
+        if span is None:
+            return self._postings[0:0]
+        return self._postings[span[0]:span[1]]
+
+    def search(self, query, surah=None):
+        """Return the sorted ayah numbers matching ``query``.
+
+        Terms within a group must all occur (AND); groups separated by ``OR``
+        are unioned.
+        """
+        groups = parse_query(query)
+        if len(groups) == 1:
+            hits = intersect([self.postings(term) for term in groups[0]])
+        else:
+            union = set()
+            for group in groups:
+                union.update(intersect([self.postings(term) for term in group]))
+            hits = sorted(union)
+        if surah:
+            if not 0 < surah < len(self.surah_starts) - 1:
+                return []
+            lo = bisect_left(hits, self.surah_starts[surah])
+            hi = bisect_left(hits, self.surah_starts[surah + 1], lo)
+            hits = hits[lo:hi]
+        return hits
+
+    def stats(self):
+        return {
+            "terms": len(self._terms),
+            "postings": len(self._buffer),
+            "posting_bytes": self._buffer.itemsize * len(self._buffer),
+        }
+
+    def save(self, path):
+        terms = list(self._terms)
+        spans = array("I")
+        for term in terms:
+            spans.extend(self._terms[term])
+        with atomic_file(path) as f:
+            pickle.dump((SNAPSHOT_FORMAT, self.version, terms, spans.tobytes(),
+                         self._buffer.tobytes(), self.surah_starts.tobytes()),
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path, version=None):
+        """Load a snapshot written by ``save``; None if missing or out of date."""
+        try:
+            with open(path, "rb") as f:
+                fmt, snap_version, terms, spans, buffer, starts = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        if fmt != SNAPSHOT_FORMAT or (version is not None and snap_version != version):
+            return None
+        span_array = array("I")
+        span_array.frombytes(spans)
+        postings = array("I")
+        postings.frombytes(buffer)
+        surah_starts = array("I")
+        surah_starts.frombytes(starts)
+        index = {sys.intern(term): (span_array[2 * i], span_array[2 * i + 1])
+                 for i, term in enumerate(terms)}
+        return cls(snap_version, index, postings, surah_starts)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def snapshot_path(store):
+    return os.path.join(os.path.dirname(os.path.abspath(store.path)), "ayah_index.pickle")
+
+
+def build_index(store):
+    """Build the index for ``store`` and write its snapshot."""
+    index = AyahIndex.build(store.ayah_rows(), version=store.version)
+    try:
+        index.save(snapshot_path(store))
+    except OSError as e:
+        print(f"Could not save ayah index snapshot: {e}")
+    return index
+
+
+def get_index(store):
+    """Return the shared index for ``store``, loading or building it once."""
+    global _index
+    index = _index
+    if index is not None and index.version == store.version:
+        return index
+    with _index_lock:
+        if _index is None or _index.version != store.version:
+            _index = (AyahIndex.load(snapshot_path(store), version=store.version)
+                      or build_index(store))
+        return _index
@@ -0,0 +1,61 @@
+"""Benchmark Arabic normalization and tokenization over the whole corpus.
+
+Uses the ingested store when there is one, otherwise a synthetic corpus of
+the same size (6,236 ayahs) built from the bundled sample. Run with:
+
+    python benchmarks/normalize.py
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import arabic
+from quran_store import ARABIC_EDITION, TRANSLATION_EDITION, get_store
+
+AYAH_COUNT = 6236
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "data", "fixtures", "quran-sample.json")
+
+
+def load_corpus():
+    store = get_store()
+    if store is not None:
+        rows = list(store.ayah_rows())
+        if len(rows) >= AYAH_COUNT:
+            return "store", [r[2] for r in rows], [r[3] for r in rows]
+    with open(FIXTURE, encoding="utf-8") as f:
+        fixture = json.load(f)
+    texts = [a["text"] for s in fixture[ARABIC_EDITION]["surahs"] for a in s["ayahs"]]
+    translations = [a["text"] for s in fixture[TRANSLATION_EDITION]["surahs"] for a in s["ayahs"]]
+    repeat = AYAH_COUNT // len(texts) + 1
+    return "synthetic", (texts * repeat)[:AYAH_COUNT], (translations * repeat)[:AYAH_COUNT]
+
+
+def best_of(fn, runs=5):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    source, texts, translations = load_corpus()
+    corpus = texts + translations
+    chars = sum(len(t) for t in corpus)
+    print(f"corpus: {source}, {len(texts)} ayahs, {chars:,} characters")
+    cases = [
+        ("normalize, per ayah", lambda: [arabic.normalize(t) for t in corpus]),
+        ("tokenize, per ayah", lambda: [arabic.tokenize(t) for t in corpus]),
+    ]
+    for name, fn in cases:
+        seconds = best_of(fn)
+        print(f"{name:<22} {seconds * 1000:8.2f} ms  {chars / seconds / 1e6:6.1f} M chars/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark upstream concurrency: the thread-pooled sync client against the
+asyncio client, both talking to a local stub of the API.
+
+The stub answers every request after a fixed delay (50 ms by default, roughly
+a round trip to api.alquran.cloud) over HTTP/1.1 keep-alive. The sync client
+can only have as many calls in flight as there are threads waiting on it; the
+async client overlaps all of them from a single caller. Run with:
+
+    python benchmarks/upstream_concurrency.py [requests] [latency_ms]
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quran_client import AsyncQuranClient, QuranClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency = 0.05
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        body = json.dumps({"code": 200, "status": "OK", "data": {"path": self.path}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def start_stub(latency):
+    StubHandler.latency = latency
+    server = StubServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1/"
+
+
+def run_sync(base_url, count, threads):
+    client = QuranClient(base_url=base_url, pool_maxsize=threads)
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda i: client.get_json(f"surah/{i}"), range(count)))
+    client.reset()
+
+
+def run_async(base_url, count, limit):
+    client = AsyncQuranClient(base_url=base_url, limit=limit)
+
+    async def main():
+        await asyncio.gather(*(client.get_json(f"surah/{i}") for i in range(count)))
+
+    asyncio.run(main())
+    client.reset()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+    server, base_url = start_stub(latency)
+    print(f"{count} requests, {latency * 1000:.0f} ms upstream latency")
+    cases = [
+        ("sync, 8 threads", lambda: run_sync(base_url, count, 8)),
+        ("sync, 32 threads", lambda: run_sync(base_url, count, 32)),
+        ("async, 1 caller, limit 100", lambda: run_async(base_url, count, 100)),
+        ("async, 1 caller, limit 400", lambda: run_async(base_url, count, 400)),
+    ]
+    for name, fn in cases:
+        start = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - start
+        # average number of requests in flight over the run
+        overlap = count * latency / seconds
+        print(f"{name:<28} {seconds:7.2f} s  {count / seconds:8.0f} req/s  {overlap:6.1f} in flight")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
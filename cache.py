@@ -0,0 +1,216 @@
+"""In-process TTL + LRU cache with a bounded memory budget, plus request
+coalescing for concurrent identical loads."""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_key(endpoint, params=None):
+    """Build a cache key from an endpoint and its query parameters.
+
+    Parameters are stringified, stripped and sorted, and empty values are
+    dropped, so ``{'surah': '', 'offset': 0}`` and ``{'offset': '0'}`` map to
+    the same entry - which matches what the upstream API sees.
+    """
+    endpoint = endpoint.strip("/")
+    if not params:
+        return endpoint
+    items = []
+    for name, value in params.items():
+        if value is None:
+            continue
+        value = str(value).strip()
+        if value == "":
+            continue
+        items.append((str(name), value))
+    if not items:
+        return endpoint
+    items.sort()
+    return endpoint + "?" + "&".join(f"{name}={value}" for name, value in items)
+
+
+def json_size(value):
+    return len(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+class _Entry:
+    __slots__ = ("value", "size", "expires", "stale_until")
+
+    def __init__(self, value, size, expires, stale_until):
+        self.value = value
+        self.size = size
+        self.expires = expires
+        self.stale_until = stale_until
+
+
+class TTLCache:
+    """Thread-safe mapping whose entries expire after a TTL.
+
+    When either ``max_entries`` or ``max_bytes`` is exceeded the least recently
+    used entries are evicted first. Sizes are measured with ``sizer`` once, on
+    insert. Cached values are shared between callers and must not be mutated.
+
+    An entry set with a ``stale_ttl`` outlives its TTL by that many seconds:
+    ``get`` treats it as missing, but ``lookup`` still returns it flagged as
+    stale so the caller can serve it while refreshing.
+    """
+
+    def __init__(self, max_entries=512, max_bytes=64 * 1024 * 1024, default_ttl=3600,
+                 sizer=json_size, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.sizer = sizer
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+
+    def lookup(self, key):
+        """Return ``(value, is_stale)`` for ``key``, or None if it is absent."""
+        now = self.clock()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.stale_until <= now:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            if entry.expires <= now:
+                self.stale_hits += 1
+                return entry.value, True
+            self.hits += 1
+            return entry.value, False
+
+    def get(self, key, default=None):
+        found = self.lookup(key)
+        if found is None or found[1]:
+            return default
+        return found[0]
+
+    def set(self, key, value, ttl=None, stale_ttl=0):
+        size = self.sizer(value)
+        if size > self.max_bytes:
+            return False
+        expires = self.clock() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = _Entry(value, size, expires, expires + stale_ttl)
+            self._bytes += size
+            self._evict()
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        entry = self._data.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self):
+        while self._data and (len(self._data) > self.max_entries
+                              or self._bytes > self.max_bytes):
+            _, entry = self._data.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        entry = self._data.get(key)
+        return entry is not None and entry.expires > self.clock()
+
+    def stats(self):
+        with self._lock:
+            served = self.hits + self.stale_hits
+            lookups = served + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key.
+
+    The first caller for a key runs the function; callers arriving while it is
+    still running wait for and share its result (or its exception) instead of
+    repeating the work.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def reset(self):
+        with self._lock:
+            self._calls = {}
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders,
+                    "shared": self.shared}
@@ -0,0 +1,118 @@
+"""Read-only binary corpus files opened with ``mmap``.
+
+A corpus file holds ``records`` x ``fields`` UTF-8 strings. Layout, in native
+byte order (recorded in the header)::
+
+    header   magic (8) | byte order (1) | pad (7) | version (16) | records (4) | fields (4)
+    keys     uint32 x records, sorted - the lookup key of each record
+    (padding to 8 bytes)
+    offsets  uint64 x (records * fields + 1) - start of each string in blobs
+    blobs    the UTF-8 strings back to back
+
+Opening a corpus only maps the file and casts the key and offset tables to
+memoryviews; nothing is parsed or copied until a string is read. Every
+process that maps the same file shares the same page-cache pages.
+"""
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+from utils import atomic_file
+
+
+MAGIC = b"BDCORP01"
+HEADER = struct.Struct("8s1s7x16sII")
+BYTE_ORDER = b"L" if sys.byteorder == "little" else b"B"
+
+
+class CorpusError(Exception):
+    pass
+
+
+def write_corpus(path, version, keys, rows):
+    """Write ``rows`` (tuples of strings, one per key) to ``path`` atomically."""
+    keys = array("I", keys)
+    if len(keys) != len(rows):
+        raise CorpusError("keys and rows differ in length")
+    if any(a >= b for a, b in zip(keys, keys[1:])):
+        raise CorpusError("keys must be strictly increasing")
+    fields = len(rows[0]) if rows else 0
+    offsets = array("Q", [0])
+    blobs = []
+    for row in rows:
+        if len(row) != fields:
+            raise CorpusError("every row needs the same number of fields")
+        for value in row:
+            data = value.encode("utf-8")
+            blobs.append(data)
+            offsets.append(offsets[-1] + len(data))
+    header = HEADER.pack(MAGIC, BYTE_ORDER, version.encode("ascii")[:16], len(keys), fields)
+    key_bytes = keys.tobytes()
+    padding = b"\0" * (-(len(header) + len(key_bytes)) % 8)
+
+    with atomic_file(path) as f:
+        f.write(header)
+        f.write(key_bytes)
+        f.write(padding)
+        f.write(offsets.tobytes())
+        for data in blobs:
+            f.write(data)
+
+
+class Corpus:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, order, version, records, fields = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise CorpusError(f"{path} is not a corpus file")
+        if order != BYTE_ORDER:
+            raise CorpusError(f"{path} was written on a machine with another byte order")
+        self.version = version.rstrip(b"\0").decode("ascii")
+        self.records = records
+        self.fields = fields
+        view = memoryview(self._map)
+        start = HEADER.size
+        end = start + 4 * records
+        self._keys = view[start:end].cast("I")
+        start = end + (-end % 8)
+        end = start + 8 * (records * fields + 1)
+        self._offsets = view[start:end].cast("Q")
+        self._blobs = end
+        # Dense keys (1..n without gaps) are found by subtraction, not search.
+        self._dense = records and self._keys[-1] - self._keys[0] + 1 == records
+
+    def __len__(self):
+        return self.records
+
+    def find(self, key):
+        """Return the position of ``key``, or None."""
+        if not self.records:
+            return None
+        if self._dense:
+            position = key - self._keys[0]
+            return position if 0 <= position < self.records else None
+        position = bisect_left(self._keys, key)
+        if position < self.records and self._keys[position] == key:
+            return position
+        return None
+
+    def key(self, position):
+        return self._keys[position]
+
+    def field(self, position, field):
+        index = position * self.fields + field
+        start = self._blobs + self._offsets[index]
+        end = self._blobs + self._offsets[index + 1]
+        return self._map[start:end].decode("utf-8")
+
+    def record(self, position):
+        return tuple(self.field(position, field) for field in range(self.fields))
+
+    def close(self):
+        self._keys.release()
+        self._offsets.release()
+        self._map.close()
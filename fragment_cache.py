@@ -0,0 +1,44 @@
+"""A ``{% cache %}`` template tag for fragments that are the same for everyone.
+
+    {% cache "surah-grid", surahs.source %}
+        ... expensive loop ...
+    {% endcache %}
+
+The rendered body is kept under the tuple of the given key parts; pass the
+data version among them so a new version renders afresh. Fragments are not
+cached while templates auto-reload (development mode), so an edited
+template is never hidden behind an old fragment.
+"""
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+from cache import TTLCache
+from utils import env_int
+
+
+fragments = TTLCache(max_entries=env_int("FRAGMENT_CACHE_MAX_ENTRIES", 1024),
+                     max_bytes=env_int("FRAGMENT_CACHE_MAX_BYTES", 32 * 1024 * 1024),
+                     default_ttl=24 * 60 * 60, sizer=len)
+
+
+class FragmentCacheExtension(Extension):
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(self.call_method("_cached", [nodes.List(parts)]),
+                               [], [], body).set_lineno(lineno)
+
+    def _cached(self, parts, caller):
+        if self.environment.auto_reload:
+            return caller()
+        key = tuple(str(part) for part in parts)
+        fragment = fragments.get(key)
+        if fragment is None:
+            fragment = caller()
+            fragments.set(key, fragment)
+        return fragment
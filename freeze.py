@@ -0,0 +1,149 @@
+"""Pre-render pages into a static directory that nginx or a CDN can serve.
+
+Every page is rendered through the app itself (with a test client), so the
+files are byte-for-byte what the live routes return. Pages are spread over a
+process pool. The output directory keeps a manifest of what each file was
+rendered from - the page's data version and a hash of its template together
+with every template it extends or includes - and a page is only rendered
+again when that changes.
+"""
+import hashlib
+import importlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from jinja2 import meta
+
+from utils import write_atomic
+
+
+FREEZE_FORMAT = 1
+MANIFEST = ".freeze-manifest.json"
+
+
+def output_path(url):
+    """The file a URL is written to: ``/surah/2`` -> ``surah/2/index.html``.
+
+    Frozen pages are served by path alone, so ``url`` must not have a query
+    string.
+    """
+    return os.path.join(*[part for part in url.split("/") if part], "index.html")
+
+
+def template_hash(env, name, _seen=None):
+    """Hash ``name`` together with the templates it extends, includes or imports."""
+    seen = set() if _seen is None else _seen
+    digest = hashlib.sha256()
+    if name in seen:
+        return digest.hexdigest()
+    seen.add(name)
+    source, _, _ = env.loader.get_source(env, name)
+    digest.update(source.encode("utf-8"))
+    for child in sorted(filter(None, meta.find_referenced_templates(env.parse(source)))):
+        digest.update(template_hash(env, child, seen).encode("ascii"))
+    return digest.hexdigest()
+
+
+_worker_app = None
+
+
+def _init_worker(import_name):
+    # Worker processes import the app themselves, which also works where
+    # processes are spawned rather than forked.
+    global _worker_app
+    _worker_app = importlib.import_module(import_name).app
+    _worker_app.config["PAGE_CACHE"] = False
+
+
+def _render(output, urls):
+    client = _worker_app.test_client()
+    done = []
+    for url in urls:
+        response = client.get(url)
+        if response.status_code == 200:
+            write_atomic(os.path.join(output, output_path(url)), response.get_data())
+        done.append((url, response.status_code))
+    return done
+
+
+def _copy_static(source, target):
+    # Copies files whose size or mtime differ from the copy already there
+    copied = 0
+    for root, _, files in os.walk(source):
+        for name in files:
+            src = os.path.join(root, name)
+            dst = os.path.join(target, os.path.relpath(src, source))
+            st = os.stat(src)
+            try:
+                dt = os.stat(dst)
+            except OSError:
+                dt = None
+            if dt is None or (dt.st_size, int(dt.st_mtime)) != (st.st_size, int(st.st_mtime)):
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                shutil.copy2(src, dst)
+                copied += 1
+    return copied
+
+
+def freeze(app, pages, output, workers=1, force=False, progress=None):
+    """Render ``pages`` - ``(url, template, data_version)`` tuples - into ``output``.
+
+    Returns ``(rendered, unchanged, removed, failed)``; ``failed`` lists
+    ``(url, status)`` for pages that did not render with a 200. Files of pages
+    that are no longer listed are deleted, and ``app``'s static folder is
+    copied to ``output/static``.
+    """
+    os.makedirs(output, exist_ok=True)
+    manifest_path = os.path.join(output, MANIFEST)
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    if manifest.get("format") != FREEZE_FORMAT:
+        manifest = {}
+    previous = manifest.get("pages", {})
+
+    templates = {}
+    wanted = {}
+    for url, template, data_version in pages:
+        if template not in templates:
+            templates[template] = template_hash(app.jinja_env, template)
+        wanted[url] = hashlib.sha256(
+            f"{templates[template]}\0{data_version}".encode("utf-8")).hexdigest()
+    stale = [url for url, fingerprint in wanted.items()
+             if force or previous.get(url) != fingerprint
+             or not os.path.exists(os.path.join(output, output_path(url)))]
+
+    removed = 0
+    for url in set(previous) - set(wanted):
+        try:
+            os.remove(os.path.join(output, output_path(url)))
+            removed += 1
+        except OSError:
+            pass
+
+    rendered, failed = {}, []
+    batches = [stale[i:i + 64] for i in range(0, len(stale), 64)]
+    with ProcessPoolExecutor(max_workers=max(1, workers), initializer=_init_worker,
+                             initargs=(app.import_name,)) as pool:
+        futures = [pool.submit(_render, output, batch) for batch in batches]
+        for future in as_completed(futures):
+            for url, status in future.result():
+                if status == 200:
+                    rendered[url] = wanted[url]
+                else:
+                    failed.append((url, status))
+            if progress:
+                progress(len(rendered) + len(failed), len(stale))
+
+    # Failed pages are left out so the next run tries them again
+    fingerprints = {url: fingerprint for url, fingerprint in wanted.items()
+                    if url in rendered or (url not in stale and url in previous)}
+    write_atomic(manifest_path, json.dumps(
+        {"format": FREEZE_FORMAT, "pages": fingerprints}, sort_keys=True).encode("utf-8"))
+    if app.static_folder and os.path.isdir(app.static_folder):
+        _copy_static(app.static_folder, os.path.join(output, "static"))
+    return len(rendered), len(wanted) - len(stale), removed, sorted(failed)
@@ -0,0 +1,260 @@
+"""Split extracted hadith collections into individual records.
+
+The segmenter runs over the cached text of a collection (see ``pdf_text``)
+and recognises the headings used by the common English translations:
+
+- ``Volume 1, Book 2, Number 13:`` (Bukhari) and ``Book 001, Number 0013:``
+  (Muslim) mark the start of a hadith and give its book and number;
+- ``Book 2: Belief`` / ``Book of Belief`` lines name the current book;
+- ``Chapter 3: ...`` / ``Chapter: ...`` lines name the current chapter;
+- ``Hadith 13`` / ``Hadith No. 13`` lines start a hadith in other layouts;
+- ``Narrated X:`` / ``It was narrated from X`` give the narrator.
+
+Records are stored column-wise: one array per field, with book titles,
+chapter titles and narrators interned in a shared string table, and the
+hadith body kept as a byte range into the cached text file. A hadith is
+found by number with one dict lookup and read with one seek; it can also be
+found by its printed reference (book and number within the book).
+"""
+import os
+import pickle
+import re
+import threading
+from array import array
+
+from utils import atomic_file
+
+
+INDEX_FORMAT = 3
+
+# Printed numbers longer than this are not headings (and would not fit the
+# index columns), so the segmenter does not treat them as such.
+_NUMBER = rb"\d{1,6}"
+
+_HADITH_REF = re.compile(
+    rb"(?:Volume\s+(?P<volume>" + _NUMBER + rb")\s*,\s*)?Book\s+(?P<book>" + _NUMBER
+    + rb")\s*,\s*Number\s+(?P<number>" + _NUMBER + rb")\s*:")
+_HADITH_HEADING = re.compile(
+    rb"^[ \t]*Hadith\s+(?:No\.?\s*)?(?P<number>" + _NUMBER + rb")\b[ \t]*[:.\-]?", re.MULTILINE | re.IGNORECASE)
+_BOOK = re.compile(
+    rb"^[ \t]*Book\s+(?:(?P<book>\d+)\s*[:.\-]\s*(?P<title>[^\n]{1,120})|of\s+(?P<of>[^\n]{1,120}))$",
+    re.MULTILINE | re.IGNORECASE)
+_CHAPTER = re.compile(
+    rb"^[ \t]*(?:Chapter|Bab)\s*(?:\d+\s*)?[:.\-]\s*(?P<title>[^\n]{1,200})$",
+    re.MULTILINE | re.IGNORECASE)
+_NARRATOR = re.compile(
+    rb"\s*(?:Narrated\s+(?P<narrated>[^:\n]{1,80}):|It\s+was\s+narrated\s+(?:from|that)\s+(?P<from>[^,:\n]{1,80}?)(?=\s+that\b|[,:\n]))")
+
+
+def _decode(value):
+    return value.decode("utf-8", "replace").strip() if value else ""
+
+
+def segment(data):
+    """Return ``(number, volume, book, book_title, chapter, narrator, start, end)`` tuples.
+
+    ``data`` is the UTF-8 text of a collection; ``number`` is the printed
+    hadith number, ``volume`` is 0 when the heading gives none, and
+    ``start``/``end`` are byte offsets of each hadith body within it.
+    """
+    events = []
+    for match in _BOOK.finditer(data):
+        events.append((match.start(), 0, match))
+    for match in _CHAPTER.finditer(data):
+        events.append((match.start(), 1, match))
+    starts = list(_HADITH_REF.finditer(data)) or list(_HADITH_HEADING.finditer(data))
+    for match in starts:
+        events.append((match.start(), 2, match))
+    events.sort(key=lambda event: (event[0], event[1]))
+
+    records = []
+    book, book_title, chapter = 0, "", ""
+    current = None
+    for position, kind, match in events:
+        if kind == 2:
+            if current is not None:
+                records.append(current + (position,))
+            groups = match.groupdict()
+            if groups.get("book"):
+                book = int(groups["book"])
+            number = int(groups["number"])
+            volume = int(groups["volume"]) if groups.get("volume") else 0
+            narrator = _NARRATOR.match(data, match.end())
+            name = ""
+            if narrator is not None:
+                name = _decode(narrator.group("narrated") or narrator.group("from"))
+            current = (number, volume, book, book_title, chapter, name, match.end())
+            continue
+        if current is not None:
+            records.append(current + (position,))
+            current = None
+        if kind == 0:
+            if match.group("book"):
+                book = int(match.group("book"))
+                book_title = _decode(match.group("title"))
+            else:
+                book_title = _decode(match.group("of"))
+            chapter = ""
+        else:
+            chapter = _decode(match.group("title"))
+    if current is not None:
+        records.append(current + (len(data),))
+    return records
+
+
+class HadithIndex:
+    """Column-wise hadith records for one collection.
+
+    ``numbering`` is ``"printed"`` when the printed hadith numbers are unique
+    across the collection, and ``"sequential"`` when they restart (e.g. per
+    book), in which case hadith ``n`` is simply the n-th one in the text. The
+    printed number and volume are kept either way, and ``find_reference``
+    looks a hadith up by book and printed number.
+    """
+
+    def __init__(self, source, numbering, strings, columns):
+        self.source = source
+        self.numbering = numbering
+        self.strings = strings
+        self.numbers = columns["numbers"]
+        self.printed = columns["printed"]
+        self.volumes = columns["volumes"]
+        self.books = columns["books"]
+        self.book_titles = columns["book_titles"]
+        self.chapters = columns["chapters"]
+        self.narrators = columns["narrators"]
+        self.starts = columns["starts"]
+        self.ends = columns["ends"]
+        self._rows = None
+        self._references = None
+
+    @classmethod
+    def build(cls, data, source=""):
+        records = segment(data)
+        strings = [""]
+        interned = {"": 0}
+
+        def intern(value):
+            index = interned.get(value)
+            if index is None:
+                index = interned[value] = len(strings)
+                strings.append(value)
+            return index
+
+        columns = {
+            "numbers": array("I"),
+            "printed": array("I"),
+            "volumes": array("H"),
+            "books": array("H"),
+            "book_titles": array("I"),
+            "chapters": array("I"),
+            "narrators": array("I"),
+            "starts": array("Q"),
+            "ends": array("Q"),
+        }
+        printed = [record[0] for record in records]
+        numbering = "printed" if len(set(printed)) == len(printed) else "sequential"
+        for position, (number, volume, book, title, chapter, narrator, start, end) in enumerate(records):
+            columns["numbers"].append(number if numbering == "printed" else position + 1)
+            columns["printed"].append(number)
+            columns["volumes"].append(min(volume, 0xFFFF))
+            columns["books"].append(min(book, 0xFFFF))
+            columns["book_titles"].append(intern(title))
+            columns["chapters"].append(intern(chapter))
+            columns["narrators"].append(intern(narrator))
+            columns["starts"].append(start)
+            columns["ends"].append(end)
+        return cls(source, numbering, strings, columns)
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def find(self, number):
+        """Return the row index for hadith ``number``, or None."""
+        if self._rows is None:
+            self._rows = {number: row for row, number in enumerate(self.numbers)}
+        return self._rows.get(number)
+
+    def find_reference(self, book, number):
+        """Return the row of printed hadith ``number`` in ``book``, or None."""
+        if self._references is None:
+            references = {}
+            for row, key in enumerate(zip(self.books, self.printed)):
+                references.setdefault(key, row)
+            self._references = references
+        return self._references.get((book, number))
+
+    def record(self, row):
+        return {
+            "number": self.numbers[row],
+            "printed": self.printed[row],
+            "volume": self.volumes[row],
+            "book": self.books[row],
+            "book_title": self.strings[self.book_titles[row]],
+            "chapter": self.strings[self.chapters[row]],
+            "narrator": self.strings[self.narrators[row]],
+        }
+
+    def read(self, row, data):
+        """Return the body of ``row`` from ``data``, the collection's text bytes."""
+        return data[self.starts[row]:self.ends[row]].decode("utf-8", "replace").strip()
+
+    def save(self, path):
+        columns = {name: getattr(self, name).tobytes()
+                   for name in ("numbers", "printed", "volumes", "books", "book_titles",
+                                "chapters", "narrators", "starts", "ends")}
+        with atomic_file(path) as f:
+            pickle.dump((INDEX_FORMAT, self.source, self.numbering, self.strings, columns),
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path, source):
+        """Load an index saved by ``save``; None if missing or built from other text."""
+        try:
+            with open(path, "rb") as f:
+                fmt, saved_source, numbering, strings, raw = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        if fmt != INDEX_FORMAT or saved_source != source:
+            return None
+        typecodes = {"numbers": "I", "printed": "I", "volumes": "H", "books": "H",
+                     "book_titles": "I", "chapters": "I", "narrators": "I", "starts": "Q",
+                     "ends": "Q"}
+        columns = {}
+        for name, typecode in typecodes.items():
+            columns[name] = array(typecode)
+            columns[name].frombytes(raw[name])
+        return cls(saved_source, numbering, strings, columns)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_hadith_index(pdf_cache, pdf_path):
+    """Return the index for ``pdf_path``, building and saving it on first use.
+
+    The index is tied to the SHA-256 of the PDF its text came from and is
+    rebuilt when that changes. Returns None if the PDF has no text.
+    """
+    meta = pdf_cache.meta(pdf_path)
+    if meta is None:
+        return None
+    source = meta["sha256"]
+    index = _indexes.get(pdf_path)
+    if index is not None and index.source == source:
+        return index
+    with _indexes_lock:
+        index = _indexes.get(pdf_path)
+        if index is None or index.source != source:
+            text_path = pdf_cache.text_path(pdf_path)
+            index_path = os.path.splitext(text_path)[0] + ".hadith"
+            index = HadithIndex.load(index_path, source)
+            if index is None:
+                index = HadithIndex.build(pdf_cache.buffer(pdf_path), source=source)
+                try:
+                    index.save(index_path)
+                except OSError as e:
+                    print(f"Could not save hadith index: {e}")
+            _indexes[pdf_path] = index
+        return index
@@ -0,0 +1,182 @@
+"""Full-text search over the extracted hadith collections.
+
+Each hadith found by ``hadith.segment`` becomes one FTS5 document; a
+collection whose layout is not recognised is indexed page by page instead.
+The index remembers which PDF (by SHA-256) each collection was built from,
+and ``sync`` re-indexes only the collections whose PDF has changed.
+
+``sync`` runs from ``flask warm-hadith``; requests only call ``refresh``,
+which compares the PDFs' size and mtime with the last sync and, when one
+changed, re-indexes in a background thread while searches keep using the
+index as it is.
+"""
+import os
+import sqlite3
+import threading
+
+from hadith import get_hadith_index
+from highlight import MARK_END, MARK_START, strip_markers
+from quran_store import fts_query
+
+
+DEFAULT_PATH = os.environ.get(
+    "HADITH_SEARCH_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "hadith_search.sqlite3"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    collection TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    documents INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS hadith_fts USING fts5(
+    body,
+    collection UNINDEXED,
+    kind UNINDEXED,
+    number UNINDEXED,
+    tokenize = "unicode61 remove_diacritics 2"
+);
+"""
+
+def _documents(pdf_cache, pdf_path):
+    # Yields (kind, number, body) for every hadith, or every page as fallback.
+    meta = pdf_cache.meta(pdf_path)
+    data = pdf_cache.buffer(pdf_path)
+    index = get_hadith_index(pdf_cache, pdf_path)
+    if index is not None and len(index):
+        for row in range(len(index)):
+            body = strip_markers(data[index.starts[row]:index.ends[row]].decode("utf-8", "replace"))
+            yield "hadith", index.numbers[row], body
+        return
+    offsets = meta["offsets"]
+    for page in range(1, len(offsets)):
+        body = strip_markers(data[offsets[page - 1]:offsets[page]].decode("utf-8", "replace"))
+        if body.strip():
+            yield "page", page, body
+
+
+def _stamps(collections):
+    # (size, mtime_ns) of every collection PDF that exists
+    stamps = {}
+    for name, pdf_path in collections.items():
+        try:
+            st = os.stat(pdf_path)
+        except OSError:
+            continue
+        stamps[name] = (st.st_size, st.st_mtime_ns)
+    return stamps
+
+
+class HadithSearch:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._indexed = None
+        self._stamps = None
+        self._refresher = None
+        self._refresher_lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def sync(self, collections, pdf_cache):
+        """Bring the index up to date with ``collections`` (name -> PDF path).
+
+        Collections whose PDF is unchanged are skipped after a stat; a
+        changed collection is deleted and re-indexed in one transaction.
+        """
+        stamps = _stamps(collections)
+        wanted = {}
+        for name in stamps:
+            meta = pdf_cache.meta(collections[name])
+            if meta is not None:
+                wanted[name] = meta["sha256"]
+        if self._indexed == wanted:
+            self._stamps = stamps
+            return
+        with self._lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                indexed = dict(conn.execute("SELECT collection, sha256 FROM sources"))
+                for name in set(indexed) - set(wanted):
+                    conn.execute("DELETE FROM hadith_fts WHERE collection = ?", (name,))
+                    conn.execute("DELETE FROM sources WHERE collection = ?", (name,))
+                for name, sha256 in wanted.items():
+                    if indexed.get(name) == sha256:
+                        continue
+                    conn.execute("DELETE FROM hadith_fts WHERE collection = ?", (name,))
+                    rows = [(body, name, kind, number) for kind, number, body
+                            in _documents(pdf_cache, collections[name])]
+                    conn.executemany(
+                        "INSERT INTO hadith_fts (body, collection, kind, number) VALUES (?, ?, ?, ?)",
+                        rows)
+                    conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)",
+                                 (name, sha256, len(rows)))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._indexed = wanted
+            self._stamps = stamps
+
+    def refresh(self, collections, pdf_cache):
+        """Start a background ``sync`` if a collection PDF changed since the
+        last one; return the thread, or None when the index is current or a
+        refresh is already running."""
+        if self._stamps == _stamps(collections):
+            return None
+        with self._refresher_lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return None
+            self._refresher = threading.Thread(target=self._refresh, args=(collections, pdf_cache),
+                                               name="hadith-search-sync", daemon=True)
+            self._refresher.start()
+            return self._refresher
+
+    def _refresh(self, collections, pdf_cache):
+        stamps = _stamps(collections)
+        try:
+            self.sync(collections, pdf_cache)
+        except Exception as e:
+            print(f"Could not update the hadith search index: {e}")
+            # Retried once a PDF changes again or warm-hadith runs
+            self._stamps = stamps
+
+    def search(self, query, collection=None, offset=0, limit=20):
+        """Return ``(total, results)`` for ``query``, best matches first.
+
+        Each result has ``collection``, ``kind`` ("hadith" or "page"),
+        ``number`` and a ``snippet`` whose matched words are wrapped in
+        ``MARK_START``/``MARK_END``.
+        """
+        match = fts_query(query)
+        if not match:
+            return 0, []
+        where = "hadith_fts MATCH ?"
+        args = [match]
+        if collection:
+            where += " AND collection = ?"
+            args.append(collection)
+        conn = self._conn()
+        total = conn.execute(f"SELECT count(*) FROM hadith_fts WHERE {where}", args).fetchone()[0]
+        if not total:
+            return 0, []
+        rows = conn.execute(
+            f"SELECT collection, kind, number, snippet(hadith_fts, 0, ?, ?, '…', 32)"
+            f" FROM hadith_fts WHERE {where} ORDER BY bm25(hadith_fts) LIMIT ? OFFSET ?",
+            [MARK_START, MARK_END] + args + [limit, min(offset, total)])
+        return total, [{"collection": r[0], "kind": r[1], "number": r[2], "snippet": r[3]}
+                       for r in rows]
+
+
+hadith_search = HadithSearch()
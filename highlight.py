@@ -0,0 +1,44 @@
+"""Markers for search hits.
+
+Search engines wrap every matched word in ``MARK_START``/``MARK_END``. The
+markers are control characters that ``strip_markers`` removes from every
+text before it is indexed or marked, and they are turned into highlight tags
+only after the text has been HTML-escaped (the ``marked`` template filter), so
+user input never reaches the page unescaped.
+
+FTS5 places the markers itself from its match offsets. For results that come
+from elsewhere (the in-memory index, a LIKE scan, the API) ``term_pattern``
+compiles all query terms into one regex and ``mark`` applies it in a single
+pass over each text.
+"""
+import re
+
+MARK_START = "\x02"
+MARK_END = "\x03"
+
+_REPLACEMENT = MARK_START + r"\g<0>" + MARK_END
+_MARKERS = {ord(MARK_START): None, ord(MARK_END): None}
+
+
+def strip_markers(text):
+    """Remove any marker characters that ``text`` itself contains."""
+    return text.translate(_MARKERS) if text else text
+
+
+def term_pattern(terms, whole_words=True):
+    """Compile a case-insensitive regex matching any of ``terms``, or return None."""
+    terms = sorted({term for term in terms if term}, key=len, reverse=True)
+    if not terms:
+        return None
+    pattern = "|".join(map(re.escape, terms))
+    if whole_words:
+        pattern = rf"(?<!\w)(?:{pattern})(?!\w)"
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def mark(text, pattern):
+    """Wrap every match of ``pattern`` in ``text`` with the markers."""
+    text = strip_markers(text)
+    if not text or pattern is None:
+        return text
+    return pattern.sub(_REPLACEMENT, text)
@@ -0,0 +1,108 @@
+"""Whole-page HTTP caching for views whose output depends only on their data.
+
+``cached_page(version)`` keeps a view's rendered 200 responses keyed by
+endpoint, view arguments, the normalized query arguments the view reads and
+the data version returned by ``version``; any other query arguments (junk or
+``utm_*`` tracking) share the same entry. Cached responses carry a strong ETag (the SHA-256 of the body),
+Last-Modified (when the data changed) and Cache-Control, and conditional
+requests that match are answered with 304 and no body.
+
+A streamed response is passed through on a miss and stored once it has been
+sent completely; it gets its ETag from the next request on.
+"""
+import functools
+import hashlib
+from datetime import datetime, timezone
+
+from flask import current_app, g, request
+
+from cache import TTLCache
+from utils import env_int
+
+
+MAX_AGE = env_int("PAGE_MAX_AGE", 3600)
+
+pages = TTLCache(max_entries=env_int("PAGE_CACHE_MAX_ENTRIES", 2048),
+                 max_bytes=env_int("PAGE_CACHE_MAX_BYTES", 128 * 1024 * 1024),
+                 default_ttl=24 * 60 * 60, sizer=lambda entry: len(entry[0]))
+
+
+def timestamp(seconds):
+    """A Last-Modified value from a Unix timestamp, or None."""
+    if not seconds:
+        return None
+    return datetime.fromtimestamp(int(seconds), tz=timezone.utc)
+
+
+def skip():
+    """Keep the response of the current request out of the page cache."""
+    g.skip_page_cache = True
+
+
+def _tee(chunks, store):
+    # Passes the chunks through and stores the body only if all of it was sent
+    parts = []
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        parts.append(chunk)
+        yield chunk
+    store(b"".join(parts))
+
+
+def _finish(response, etag, modified):
+    if etag is not None:
+        response.set_etag(etag)
+    if modified is not None:
+        response.last_modified = modified
+    response.cache_control.public = True
+    response.cache_control.max_age = MAX_AGE
+    return response.make_conditional(request)
+
+
+def cached_page(version, query=None):
+    """Cache a view's pages; ``version(**view_args)`` returns ``(data_version,
+    last_modified)``, or None when the page must not be cached.
+
+    ``query(request.args)`` returns the hashable, normalized form of the query
+    arguments the view reads; without it the query string is not part of the
+    key at all.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            run = current_app.ensure_sync(view)
+            if not current_app.config.get("PAGE_CACHE", True) or request.method not in ("GET", "HEAD"):
+                return run(**kwargs)
+            current = version(**kwargs)
+            if current is None:
+                return run(**kwargs)
+            data_version, modified = current
+            key = (request.endpoint, tuple(sorted(kwargs.items())),
+                   query(request.args) if query else None, data_version)
+
+            entry = pages.get(key)
+            if entry is not None:
+                body, etag, mimetype = entry
+                response = current_app.response_class(body, mimetype=mimetype)
+                return _finish(response, etag, modified)
+
+            response = current_app.make_response(run(**kwargs))
+            if response.status_code != 200 or g.get("skip_page_cache"):
+                return response
+            mimetype = response.mimetype
+
+            def store(body):
+                pages.set(key, (body, hashlib.sha256(body).hexdigest(), mimetype))
+
+            if response.is_streamed:
+                response.response = _tee(response.response, store)
+                # Otherwise make_conditional buffers the body to measure it
+                response.automatically_set_content_length = False
+                return _finish(response, None, modified)
+            body = response.get_data()
+            store(body)
+            return _finish(response, hashlib.sha256(body).hexdigest(), modified)
+        return wrapper
+    return decorator
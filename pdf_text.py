@@ -0,0 +1,294 @@
+"""PDF text extraction with a persistent, page-indexed cache.
+
+Extracting a whole hadith collection with PyPDF2 takes tens of seconds, so it
+is done once per PDF. The text is written to ``PDF_CACHE_DIR`` together with
+the size, mtime and SHA-256 of the PDF it came from and the byte offset of
+every page, and reused by every worker and across restarts until the PDF
+itself changes. Workers that miss the cache together wait on a lock file
+while one of them extracts; where the cache cannot be written at all, each
+process keeps the text it extracted in memory.
+"""
+import contextlib
+import hashlib
+import json
+import mmap
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, each process extracts
+    fcntl = None
+
+import PyPDF2
+
+from utils import write_atomic
+
+
+CACHE_FORMAT = 3
+CACHE_DIR = os.environ.get(
+    "PDF_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "pdf_cache"))
+
+
+def _extract_range(pdf_path, start, stop):
+    # Runs in a worker process: each worker parses the PDF itself and extracts
+    # its own page range. A page that fails is recorded and left empty.
+    texts, failures = [], []
+    reader = PyPDF2.PdfReader(pdf_path)
+    for number in range(start, stop):
+        try:
+            texts.append(reader.pages[number].extract_text() or "")
+        except Exception as e:
+            texts.append("")
+            failures.append((number, str(e)))
+    return start, texts, failures
+
+
+def _shards(page_count, workers):
+    # Several shards per worker keep all cores busy when some pages are slow.
+    size = max(1, -(-page_count // (workers * 4)))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def extract_pages(pdf_path, workers=1, progress=None):
+    """Extract every page of ``pdf_path`` and return ``(pages, failures)``.
+
+    ``pages`` holds one string per PDF page, in order; ``failures`` lists
+    ``(page_index, error)`` for pages that could not be extracted. With
+    ``workers`` > 1 the page ranges are spread over a process pool.
+    ``progress(done, total)`` is called as pages complete.
+    """
+    try:
+        page_count = len(PyPDF2.PdfReader(pdf_path).pages)
+    except Exception as e:
+        print(f"Error reading PDF: {e}")
+        return [], []
+    shards = _shards(page_count, workers)
+    pages = [""] * page_count
+    failures = []
+    done = 0
+    if workers <= 1 or len(shards) <= 1:
+        for start, stop in shards:
+            _, texts, failed = _extract_range(pdf_path, start, stop)
+            pages[start:stop] = texts
+            failures.extend(failed)
+            done += stop - start
+            if progress:
+                progress(done, page_count)
+        return pages, failures
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_extract_range, pdf_path, start, stop): (start, stop)
+                   for start, stop in shards}
+        for future in as_completed(futures):
+            start, stop = futures[future]
+            try:
+                _, texts, failed = future.result()
+            except Exception as e:
+                # The whole shard died (e.g. the worker crashed); keep the rest.
+                texts = [""] * (stop - start)
+                failed = [(number, str(e)) for number in range(start, stop)]
+            pages[start:stop] = texts
+            failures.extend(failed)
+            done += stop - start
+            if progress:
+                progress(done, page_count)
+    failures.sort()
+    return pages, failures
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_paths(pdf_path):
+    name = os.path.splitext(os.path.basename(pdf_path))[0]
+    base = os.path.join(CACHE_DIR, name)
+    return base + ".txt", base + ".json"
+
+
+@contextlib.contextmanager
+def _extraction_lock(lock_path):
+    # Holds an exclusive flock on lock_path so that only one process extracts
+    # a PDF at a time; the others wait and then find its cache. Without a
+    # writable cache directory there is nothing to share, and no lock.
+    try:
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        f = open(lock_path, "ab")
+    except OSError:
+        f = None
+    if f is None:
+        yield
+        return
+    with f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        yield
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("format") != CACHE_FORMAT:
+        return None
+    return meta
+
+
+class PDFTextCache:
+    """Extracted PDF text on disk, indexed by page.
+
+    The pages are stored back to back in one UTF-8 file; the metadata records
+    the byte offset where each page starts (plus the end of the last page).
+    The text file is mmap'ed read-only, so reading a page is a slice of shared
+    page-cache memory and only the metadata lives on the Python heap.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = {}
+        self._maps = {}
+        self.extractions = 0
+
+    def meta(self, pdf_path, workers=1, progress=None):
+        """Return the cache metadata for ``pdf_path``, extracting it if needed.
+
+        Returns None when the PDF is missing or no text could be extracted.
+        ``workers`` and ``progress`` are passed on to the extraction when the
+        cache has to be rebuilt.
+        """
+        try:
+            st = os.stat(pdf_path)
+        except OSError as e:
+            print(f"Error reading PDF: {e}")
+            return None
+        stamp = (st.st_size, st.st_mtime_ns)
+        memo = self._meta.get(pdf_path)
+        if memo is not None and memo[0] == stamp:
+            return memo[1]
+        with self._lock:
+            memo = self._meta.get(pdf_path)
+            if memo is not None and memo[0] == stamp:
+                return memo[1]
+            meta = self._load(pdf_path, stamp, workers, progress)
+            if meta is not None:
+                self._meta[pdf_path] = (stamp, meta)
+            return meta
+
+    def _load(self, pdf_path, stamp, workers, progress):
+        text_path, meta_path = _cache_paths(pdf_path)
+        meta = self._current_meta(meta_path, text_path, stamp)
+        if meta is not None:
+            return meta
+        with _extraction_lock(os.path.splitext(text_path)[0] + ".lock"):
+            # Another process may have written the cache while this one waited
+            meta = self._current_meta(meta_path, text_path, stamp)
+            if meta is not None:
+                return meta
+            return self._extract(pdf_path, stamp, workers, progress)
+
+    @staticmethod
+    def _current_meta(meta_path, text_path, stamp):
+        meta = _read_meta(meta_path)
+        if (meta is not None and (meta.get("size"), meta.get("mtime_ns")) == stamp
+                and os.path.exists(text_path)):
+            return meta
+        return None
+
+    def _extract(self, pdf_path, stamp, workers, progress):
+        text_path, meta_path = _cache_paths(pdf_path)
+        meta = _read_meta(meta_path)
+        # Same size but a new mtime (a copy or a touch) keeps the cache as
+        # long as the contents hash the same.
+        sha256 = file_sha256(pdf_path)
+        if meta is not None and meta.get("sha256") == sha256 and os.path.exists(text_path):
+            meta.update(size=stamp[0], mtime_ns=stamp[1])
+            try:
+                write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+            except OSError as e:
+                print(f"Could not update the text cache of {pdf_path}: {e}")
+            return meta
+        pages, failures = extract_pages(pdf_path, workers=workers, progress=progress)
+        self.extractions += 1
+        for number, error in failures:
+            print(f"Error reading PDF page {number + 1} of {pdf_path}: {error}")
+        if not any(pages):
+            return None
+        # Every page ends with a newline so a heading at the top of one page is
+        # not glued to the last line of the previous one.
+        encoded = [(page if page.endswith("\n") else page + "\n").encode("utf-8")
+                   for page in pages]
+        offsets = [0]
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+        meta = {
+            "format": CACHE_FORMAT,
+            "pdf": os.path.basename(pdf_path),
+            "size": stamp[0],
+            "mtime_ns": stamp[1],
+            "sha256": sha256,
+            "offsets": offsets,
+            "failed_pages": [number for number, _ in failures],
+        }
+        text = b"".join(encoded)
+        try:
+            write_atomic(text_path, text)
+            write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+        except OSError as e:
+            # A missing or read-only cache directory: this process keeps the
+            # text in memory and serves it from there.
+            print(f"Could not write the text cache of {pdf_path}: {e}")
+            self._maps[pdf_path] = (sha256, text)
+        return meta
+
+    def text_path(self, pdf_path):
+        return _cache_paths(pdf_path)[0]
+
+    def buffer(self, pdf_path):
+        """Return a read-only mmap of the cached text, or None if there is none.
+
+        When the cache could not be written this is the text itself, held in
+        memory.
+        """
+        meta = self.meta(pdf_path)
+        if meta is None:
+            return None
+        mapped = self._maps.get(pdf_path)
+        if mapped is not None and mapped[0] == meta["sha256"]:
+            return mapped[1]
+        with self._lock:
+            mapped = self._maps.get(pdf_path)
+            if mapped is None or mapped[0] != meta["sha256"]:
+                with open(self.text_path(pdf_path), "rb") as f:
+                    mapped = (meta["sha256"], mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                self._maps[pdf_path] = mapped
+            return mapped[1]
+
+    def page_count(self, pdf_path):
+        meta = self.meta(pdf_path)
+        return len(meta["offsets"]) - 1 if meta else 0
+
+    def page(self, pdf_path, number):
+        """Return the text of 1-based page ``number``, or None if out of range."""
+        return self.pages(pdf_path, number, number)
+
+    def pages(self, pdf_path, first, last):
+        """Return the text of pages ``first``..``last`` (1-based, inclusive)."""
+        meta = self.meta(pdf_path)
+        if meta is None:
+            return None
+        offsets = meta["offsets"]
+        if not 1 <= first <= last < len(offsets):
+            return None
+        start, end = offsets[first - 1], offsets[last]
+        return self.buffer(pdf_path)[start:end].decode("utf-8")
+
+
+pdf_cache = PDFTextCache()
@@ -0,0 +1,396 @@
+"""Shared HTTP client for the AlQuran Cloud API.
+
+One pooled keep-alive session is shared by every thread in a worker so page
+views reuse open TCP/TLS connections instead of paying a handshake each time.
+Async views use ``AsyncQuranClient`` instead, which keeps its own pool on a
+single background event loop.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache import SingleFlight, TTLCache, make_key
+from utils import env_float, env_int
+
+
+BASE_URL = "https://api.alquran.cloud/v1/"
+
+
+class QuranClient:
+    def __init__(self, base_url=BASE_URL, pool_connections=None, pool_maxsize=None,
+                 pool_block=False, connect_timeout=None, read_timeout=None):
+        self.base_url = base_url
+        # pool_connections is the number of hosts kept pooled, pool_maxsize the
+        # number of connections kept open per host. When every pooled
+        # connection is busy a thread opens an extra one, which is closed after
+        # use; with pool_block set it would instead wait for a free connection
+        # with no time limit, stalling page views behind a slow upstream.
+        self.pool_connections = pool_connections or env_int("QURAN_POOL_HOSTS", 4)
+        self.pool_maxsize = pool_maxsize or env_int("QURAN_POOL_MAXSIZE", 16)
+        self.pool_block = pool_block
+        self.timeout = (
+            connect_timeout or env_float("QURAN_CONNECT_TIMEOUT", 3.05),
+            read_timeout or env_float("QURAN_READ_TIMEOUT", 10.0),
+        )
+        self._lock = threading.Lock()
+        self._session = None
+        self._pid = None
+        self._requests = 0
+        self._errors = 0
+
+    def _build_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                              pool_maxsize=self.pool_maxsize,
+                              pool_block=self.pool_block)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["Accept"] = "application/json"
+        return session
+
+    @property
+    def session(self):
+        # Sockets must never be shared between a parent and a forked child, so
+        # a session created in another process is thrown away, not reused.
+        session = self._session
+        if session is not None and self._pid == os.getpid():
+            return session
+        with self._lock:
+            if self._session is None or self._pid != os.getpid():
+                self._session = self._build_session()
+                self._pid = os.getpid()
+            return self._session
+
+    def get_json(self, endpoint, params=None):
+        """GET ``endpoint`` relative to the base URL and return the decoded JSON.
+
+        Raises ``requests.exceptions.RequestException`` on transport or HTTP
+        errors; the caller decides how to report them.
+        """
+        with self._lock:
+            self._requests += 1
+        try:
+            response = self.session.get(self.base_url + endpoint, params=params,
+                                        timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except (requests.exceptions.RequestException, ValueError):
+            with self._lock:
+                self._errors += 1
+            raise
+
+    def reset(self):
+        """Drop the current session and its pooled connections."""
+        with self._lock:
+            session, self._session, self._pid = self._session, None, None
+        if session is not None:
+            session.close()
+
+    def _after_fork(self):
+        # Runs in the child only: the inherited lock may be held by a thread
+        # that no longer exists, and the inherited sockets belong to the parent.
+        self._lock = threading.Lock()
+        self._session = None
+        self._pid = None
+
+    def stats(self):
+        pools = []
+        session = self._session
+        if session is not None and self._pid == os.getpid():
+            adapter = session.get_adapter(self.base_url)
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is None:
+                    continue
+                pools.append({
+                    "host": pool.host,
+                    "connections_opened": pool.num_connections,
+                    "requests": pool.num_requests,
+                    "idle": pool.pool.qsize() if pool.pool is not None else 0,
+                    "maxsize": self.pool_maxsize,
+                })
+        return {
+            "requests": self._requests,
+            "errors": self._errors,
+            "timeout": list(self.timeout),
+            "pools": pools,
+        }
+
+
+# What AsyncQuranClient.get_json raises, like RequestException for QuranClient
+ASYNC_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, ValueError)
+
+
+class AsyncQuranClient:
+    """asyncio counterpart of ``QuranClient``.
+
+    Every request runs on one event loop in a background thread, over one
+    aiohttp connection pool of up to ``limit`` keep-alive connections, so
+    connections are reused across page views and hundreds of calls can be in
+    flight at once. ``get_json`` may be awaited from any other event loop,
+    such as the one Flask starts for each async view.
+    """
+
+    def __init__(self, base_url=BASE_URL, limit=None, connect_timeout=None, read_timeout=None):
+        self.base_url = base_url
+        self.limit = limit or env_int("QURAN_ASYNC_LIMIT", 100)
+        self.connect_timeout = connect_timeout or env_float("QURAN_CONNECT_TIMEOUT", 3.05)
+        self.read_timeout = read_timeout or env_float("QURAN_READ_TIMEOUT", 10.0)
+        self._lock = threading.Lock()
+        self._loop = None
+        self._session = None
+        self._pid = None
+        self._requests = 0
+        self._errors = 0
+
+    @property
+    def loop(self):
+        # Like the sync session, a loop started in another process is replaced.
+        loop = self._loop
+        if loop is not None and self._pid == os.getpid():
+            return loop
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._session = None
+                self._pid = os.getpid()
+                threading.Thread(target=self._loop.run_forever, name="quran-async",
+                                 daemon=True).start()
+            return self._loop
+
+    def _get_session(self):
+        # Only called on the loop thread, which owns the session.
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit),
+                timeout=aiohttp.ClientTimeout(sock_connect=self.connect_timeout,
+                                              sock_read=self.read_timeout),
+                headers={"Accept": "application/json"})
+        return self._session
+
+    async def _request(self, endpoint, params):
+        async with self._get_session().get(self.base_url + endpoint, params=params) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    def submit(self, endpoint, params=None):
+        """Start GET ``endpoint`` on the client's loop and return its
+        ``concurrent.futures.Future``."""
+        if params:
+            params = {name: str(value) for name, value in params.items() if value is not None}
+        with self._lock:
+            self._requests += 1
+        future = asyncio.run_coroutine_threadsafe(self._request(endpoint, params), self.loop)
+        future.add_done_callback(self._count_error)
+        return future
+
+    def _count_error(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            with self._lock:
+                self._errors += 1
+
+    async def get_json(self, endpoint, params=None):
+        """Await GET ``endpoint`` and return the decoded JSON.
+
+        Raises one of ``ASYNC_ERRORS`` on transport or HTTP errors.
+        """
+        return await asyncio.wrap_future(self.submit(endpoint, params))
+
+    def reset(self):
+        """Close the pooled connections and stop the loop thread."""
+        with self._lock:
+            loop, session = self._loop, self._session
+            self._loop, self._session, self._pid = None, None, None
+        if loop is None:
+            return
+        if session is not None:
+            asyncio.run_coroutine_threadsafe(session.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+    def _after_fork(self):
+        # The loop thread does not survive a fork and its sockets are the parent's.
+        self._lock = threading.Lock()
+        self._loop = None
+        self._session = None
+        self._pid = None
+
+    def stats(self):
+        return {
+            "requests": self._requests,
+            "errors": self._errors,
+            "limit": self.limit,
+            "running": self._loop is not None and self._pid == os.getpid(),
+        }
+
+
+CACHE_TTL = env_float("QURAN_CACHE_TTL", 24 * 60 * 60)
+SEARCH_CACHE_TTL = env_float("QURAN_SEARCH_CACHE_TTL", 10 * 60)
+STALE_TTL = env_float("QURAN_STALE_TTL", 7 * 24 * 60 * 60)
+FAILURE_TTL = env_float("QURAN_FAILURE_TTL", 30)
+
+
+def cache_ttl(endpoint):
+    # Surah metadata and surah texts never change; search results get a
+    # shorter lifetime so upstream index changes are eventually picked up.
+    if endpoint.strip("/").startswith("search"):
+        return SEARCH_CACHE_TTL
+    return CACHE_TTL
+
+
+class QuranAPI:
+    """Cached access to the AlQuran Cloud API.
+
+    Fresh entries are served from ``cache``. Expired entries are still served
+    for up to ``stale_ttl`` seconds while a background thread refreshes them.
+    Failed calls are remembered in ``failures`` for ``failure_ttl`` seconds,
+    during which the key is neither fetched nor refreshed again. Concurrent
+    loads of the same key, foreground or background, share one upstream call.
+
+    ``get_async`` does the same for async views through ``async_client``.
+    """
+
+    def __init__(self, client, cache, stale_ttl=STALE_TTL, failure_ttl=FAILURE_TTL,
+                 refresh_workers=2, async_client=None):
+        self.client = client
+        self.async_client = async_client
+        self.cache = cache
+        self.stale_ttl = stale_ttl
+        self.failure_ttl = failure_ttl
+        self.failures = TTLCache(max_entries=4096, max_bytes=1024 * 1024,
+                                 default_ttl=failure_ttl)
+        self.refresh_workers = refresh_workers
+        self.flights = SingleFlight()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._async_flights = {}
+        self._executor = None
+        self._pid = None
+        self.failure_hits = 0
+        self.refreshes = 0
+
+    def get(self, endpoint, params=None):
+        """Return the decoded response for ``endpoint``, or None if unavailable."""
+        key = make_key(endpoint, params)
+        answered, data = self._cached(key, endpoint, params)
+        if answered:
+            return data
+        return self._load(key, endpoint, params)
+
+    async def get_async(self, endpoint, params=None):
+        """Coroutine version of ``get``: same cache, stale and failure handling,
+        but a miss is awaited on ``async_client`` instead of blocking a thread."""
+        key = make_key(endpoint, params)
+        answered, data = self._cached(key, endpoint, params)
+        if answered:
+            return data
+        with self._lock:
+            future = self._async_flights.get(key)
+            leader = future is None
+            if leader:
+                future = self._async_flights[key] = self.async_client.submit(endpoint, params)
+        try:
+            # Shielded so one cancelled view does not cancel a shared call
+            data = await asyncio.shield(asyncio.wrap_future(future))
+        except ASYNC_ERRORS as e:
+            if leader:
+                print(f"Error calling API: {e}")
+                self.failures.set(key, str(e))
+            return None
+        finally:
+            if leader:
+                with self._lock:
+                    self._async_flights.pop(key, None)
+        if leader:
+            self.cache.set(key, data, ttl=cache_ttl(endpoint), stale_ttl=self.stale_ttl)
+            self.failures.delete(key)
+        return data
+
+    def _cached(self, key, endpoint, params):
+        # (True, value) when the cache or a remembered failure answers for key
+        found = self.cache.lookup(key)
+        if found is not None:
+            data, stale = found
+            if stale and key not in self.failures:
+                self._refresh_later(key, endpoint, params)
+            return True, data
+        if key in self.failures:
+            with self._lock:
+                self.failure_hits += 1
+            return True, None
+        return False, None
+
+    def _load(self, key, endpoint, params):
+        return self.flights.do(key, self._fetch, key, endpoint, params)
+
+    def _fetch(self, key, endpoint, params):
+        try:
+            data = self.client.get_json(endpoint, params=params)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error calling API: {e}")
+            self.failures.set(key, str(e))
+            return None
+        self.cache.set(key, data, ttl=cache_ttl(endpoint), stale_ttl=self.stale_ttl)
+        self.failures.delete(key)
+        return data
+
+    def _refresh_later(self, key, endpoint, params):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.refresh_workers,
+                                                    thread_name_prefix="quran-refresh")
+                self._pid = os.getpid()
+            self._refreshing.add(key)
+            self.refreshes += 1
+            executor = self._executor
+        params = dict(params) if params else None
+        executor.submit(self._refresh, key, endpoint, params)
+
+    def _refresh(self, key, endpoint, params):
+        try:
+            self._load(key, endpoint, params)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _after_fork(self):
+        # Refresh threads do not survive a fork; start over in the child.
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._async_flights = {}
+        self._executor = None
+        self._pid = None
+        self.flights.reset()
+
+    def stats(self):
+        return {
+            "upstream": self.client.stats(),
+            "upstream_async": self.async_client.stats() if self.async_client else None,
+            "cache": self.cache.stats(),
+            "failures": {
+                "entries": len(self.failures),
+                "hits": self.failure_hits,
+                "ttl": self.failure_ttl,
+            },
+            "background_refreshes": self.refreshes,
+            "coalescing": self.flights.stats(),
+        }
+
+
+client = QuranClient()
+async_client = AsyncQuranClient()
+response_cache = TTLCache(max_entries=env_int("QURAN_CACHE_MAX_ENTRIES", 1024),
+                          max_bytes=env_int("QURAN_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+                          default_ttl=CACHE_TTL)
+api = QuranAPI(client, response_cache, async_client=async_client)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=client._after_fork)
+    os.register_at_fork(after_in_child=async_client._after_fork)
+    os.register_at_fork(after_in_child=api._after_fork)
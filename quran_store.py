@@ -0,0 +1,440 @@
+"""Local on-disk copy of the Quran text (Arabic + English translation).
+
+The store is a SQLite file written once by ``flask ingest-quran`` and opened
+read-only by the app, so surah pages, the surah list and search never have to
+call the AlQuran Cloud API. Search runs on an FTS5 index built at ingest.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import arabic
+from corpus import Corpus, CorpusError, write_corpus
+from highlight import MARK_END, MARK_START, mark, strip_markers, term_pattern
+from surahs import SurahTable
+from utils import atomic_path
+
+
+ARABIC_EDITION = "quran-uthmani"
+TRANSLATION_EDITION = "en.sahih"
+TRANSLATION_NAME = "Saheeh International"
+DEFAULT_PATH = os.environ.get(
+    "QURAN_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "quran.sqlite3"))
+
+SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE surahs (
+    number INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    english_name TEXT NOT NULL,
+    english_name_translation TEXT NOT NULL,
+    revelation_type TEXT NOT NULL,
+    number_of_ayahs INTEGER NOT NULL
+);
+CREATE TABLE ayahs (
+    number INTEGER PRIMARY KEY,
+    surah INTEGER NOT NULL REFERENCES surahs(number),
+    number_in_surah INTEGER NOT NULL,
+    juz INTEGER,
+    page INTEGER,
+    text TEXT NOT NULL,
+    translation TEXT NOT NULL
+);
+CREATE UNIQUE INDEX ayahs_surah ON ayahs(surah, number_in_surah);
+"""
+
+# Full-text index over both texts, keyed by ayah number. The Arabic column
+# holds the text run through arabic.normalize (queries are normalized the same
+# way), since unicode61 would otherwise split words at every vowel mark.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE ayahs_fts USING fts5(
+    translation,
+    arabic,
+    tokenize = "unicode61 remove_diacritics 2"
+);
+"""
+
+
+class IngestError(Exception):
+    pass
+
+
+def fetch_editions(client):
+    """Download the full Arabic text and translation from the API."""
+    editions = {}
+    for edition in (ARABIC_EDITION, TRANSLATION_EDITION):
+        payload = client.get_json(f"quran/{edition}")
+        if not payload or not payload.get("data"):
+            raise IngestError(f"Empty response for edition {edition}")
+        editions[edition] = payload["data"]
+    return editions
+
+
+def load_fixture(path):
+    """Read editions from a JSON file instead of the network.
+
+    The file maps edition identifiers to the ``data`` object the API returns
+    for ``quran/<edition>``; raw API responses (with a top-level ``data``) are
+    accepted too.
+    """
+    with open(path, encoding="utf-8") as f:
+        fixture = json.load(f)
+    editions = {}
+    for edition in (ARABIC_EDITION, TRANSLATION_EDITION):
+        data = fixture.get(edition)
+        if data is None:
+            raise IngestError(f"Fixture {path} has no '{edition}' edition")
+        editions[edition] = data.get("data", data)
+    return editions
+
+
+def _rows(editions):
+    arabic_surahs = editions[ARABIC_EDITION]["surahs"]
+    translation = {s["number"]: s for s in editions[TRANSLATION_EDITION]["surahs"]}
+    surahs, ayahs = [], []
+    for surah in arabic_surahs:
+        translated = translation.get(surah["number"])
+        if translated is None or len(translated["ayahs"]) != len(surah["ayahs"]):
+            raise IngestError(f"Editions disagree on surah {surah['number']}")
+        surahs.append((surah["number"], surah["name"], surah["englishName"],
+                       surah["englishNameTranslation"], surah["revelationType"],
+                       len(surah["ayahs"])))
+        for ayah, english in zip(surah["ayahs"], translated["ayahs"]):
+            ayahs.append((ayah["number"], surah["number"], ayah["numberInSurah"],
+                          ayah.get("juz"), ayah.get("page"), strip_markers(ayah["text"]),
+                          strip_markers(english["text"])))
+    return surahs, ayahs
+
+
+def fts_query(query):
+    """Turn free text into an FTS5 query that ANDs every word.
+
+    A bare ``OR`` between words separates alternatives. Every other word is
+    quoted, so FTS5 operators and punctuation in user input are matched
+    literally instead of being parsed.
+    """
+    groups = [[]]
+    for word in query.split():
+        if word == "OR":
+            groups.append([])
+            continue
+        groups[-1].extend(arabic.tokenize(word))
+    groups = [" ".join(f'"{term}"' for term in group) for group in groups if group]
+    if len(groups) == 1:
+        return groups[0]
+    return " OR ".join(f"({group})" for group in groups)
+
+
+def ingest(editions, path=DEFAULT_PATH):
+    """Write ``editions`` to a fresh store at ``path``.
+
+    The database is built next to the target and moved into place, so a
+    running app never sees a half-written file.
+    """
+    surahs, ayahs = _rows(editions)
+    digest = hashlib.sha1()
+    for row in ayahs:
+        digest.update(f"{row[0]}\t{row[5]}\t{row[6]}\n".encode("utf-8"))
+    version = digest.hexdigest()[:16]
+
+    with atomic_path(path) as tmp_path:
+        _write_database(tmp_path, version, surahs, ayahs)
+        write_corpus(corpus_path(path), version, [row[0] for row in ayahs],
+                     [(row[5], row[6]) for row in ayahs])
+    return len(surahs), len(ayahs)
+
+
+def _write_database(path, version, surahs, ayahs):
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany("INSERT INTO surahs VALUES (?, ?, ?, ?, ?, ?)", surahs)
+        conn.executemany("INSERT INTO ayahs VALUES (?, ?, ?, ?, ?, ?, ?)", ayahs)
+        try:
+            conn.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5: search falls back to LIKE scans.
+            print(f"Full-text index not built: {e}")
+        else:
+            normalized = [arabic.normalize(row[5]) for row in ayahs]
+            conn.executemany("INSERT INTO ayahs_fts (rowid, translation, arabic) VALUES (?, ?, ?)",
+                             ((row[0], row[6], text) for row, text in zip(ayahs, normalized)))
+            conn.execute("INSERT INTO ayahs_fts (ayahs_fts) VALUES ('optimize')")
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("version", version),
+            ("editions", f"{ARABIC_EDITION},{TRANSLATION_EDITION}"),
+            ("ingested_at", str(int(time.time()))),
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def corpus_path(path):
+    """The mmap'ed ayah text corpus that sits next to the store at ``path``."""
+    return os.path.splitext(path)[0] + ".corpus"
+
+
+def _surah_dict(row):
+    return {
+        "number": row[0],
+        "name": row[1],
+        "englishName": row[2],
+        "englishNameTranslation": row[3],
+        "revelationType": row[4],
+        "numberOfAyahs": row[5],
+    }
+
+
+class QuranStore:
+    """Read-only access to an ingested store; one connection per thread.
+
+    Ayah texts for surah pages and search results come from the mmap'ed
+    corpus written alongside the database when it matches the store version,
+    so every worker shares one copy of them in the page cache.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._local = threading.local()
+        meta = self.meta()
+        self.version = meta.get("version", "")
+        self.ingested_at = int(meta.get("ingested_at", 0))
+        self.has_fts = self._conn().execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'ayahs_fts'").fetchone() is not None
+        self.corpus = self._open_corpus()
+        self.surah_table = SurahTable.from_dicts(
+            (_surah_dict(row) for row in self._conn().execute(
+                "SELECT number, name, english_name, english_name_translation,"
+                " revelation_type, number_of_ayahs FROM surahs")),
+            self.version)
+        # surah -> (number of its first ayah, ayah count), for range lookups
+        self._spans = {row[0]: (row[1], row[2]) for row in self._conn().execute(
+            "SELECT surah, min(number), count(*) FROM ayahs GROUP BY surah")}
+
+    def _open_corpus(self):
+        try:
+            corpus = Corpus(corpus_path(self.path))
+        except (OSError, ValueError, CorpusError):
+            return None
+        if corpus.version != self.version:
+            corpus.close()
+            return None
+        return corpus
+
+    def texts(self, number):
+        """Return ``(text, translation)`` of ayah ``number`` from the corpus."""
+        position = self.corpus.find(number)
+        if position is None:
+            return "", ""
+        return self.corpus.record(position)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def meta(self):
+        return dict(self._conn().execute("SELECT key, value FROM meta"))
+
+    def surahs(self):
+        """The surah table, loaded once when the store is opened."""
+        return self.surah_table
+
+    def surah(self, number, lazy=False):
+        """Return a surah shaped like the API's ``surah/<n>`` data, or None.
+
+        Each ayah carries the Arabic ``text`` and the English ``translation``.
+        With ``lazy`` the ayahs are a generator read as they are consumed,
+        for pages that are streamed rather than rendered in one piece.
+        """
+        surah = self.surah_info(number)
+        if surah is None:
+            return None
+        conn = self._conn()
+        if self.corpus is not None:
+            rows = (r + self.texts(r[0]) for r in conn.execute(
+                "SELECT number, number_in_surah, juz, page"
+                " FROM ayahs WHERE surah = ? ORDER BY number_in_surah", (number,)))
+        else:
+            rows = conn.execute(
+                "SELECT number, number_in_surah, juz, page, text, translation"
+                " FROM ayahs WHERE surah = ? ORDER BY number_in_surah", (number,))
+        ayahs = (
+            {"number": r[0], "numberInSurah": r[1], "juz": r[2], "page": r[3],
+             "text": r[4], "translation": r[5]}
+            for r in rows
+        )
+        surah["ayahs"] = ayahs if lazy else list(ayahs)
+        return surah
+
+    def ayahs(self, surah, start, end):
+        """Return ayahs ``start``..``end`` (inclusive) of ``surah``, or None.
+
+        The range is clipped to the surah; None means the surah is unknown or
+        the range is empty. Ayahs are shaped like those of ``surah`` and are
+        read by ayah number, so the cost is that of the range alone.
+        """
+        span = self._spans.get(surah)
+        if span is None:
+            return None
+        first, count = span
+        end = min(end, count)
+        if not 1 <= start <= end:
+            return None
+        numbers = (first + start - 1, first + end - 1)
+        conn = self._conn()
+        if self.corpus is not None:
+            rows = [r + self.texts(r[0]) for r in conn.execute(
+                "SELECT number, number_in_surah, juz, page"
+                " FROM ayahs WHERE number BETWEEN ? AND ?", numbers)]
+        else:
+            rows = conn.execute(
+                "SELECT number, number_in_surah, juz, page, text, translation"
+                " FROM ayahs WHERE number BETWEEN ? AND ?", numbers)
+        return [{"number": r[0], "numberInSurah": r[1], "juz": r[2], "page": r[3],
+                 "text": r[4], "translation": r[5]} for r in rows]
+
+    def surah_info(self, number):
+        """Return the surah's metadata without its ayahs, or None."""
+        surah = self.surah_table.get(number)
+        return surah.as_dict() if surah is not None else None
+
+    def ayah_rows(self):
+        """Yield ``(number, surah, text, translation)`` for every ayah in order."""
+        return self._conn().execute(
+            "SELECT number, surah, text, translation FROM ayahs ORDER BY number")
+
+    def results(self, numbers, marked=None):
+        """Return search result dicts for the given ayah numbers, in order.
+
+        ``marked`` maps ayah numbers to their highlighted translation.
+        """
+        if not numbers:
+            return []
+        numbers = list(numbers)
+        placeholders = ",".join("?" * len(numbers))
+        if self.corpus is not None:
+            rows = [(r[0], r[1]) + self.texts(r[4]) + (r[2], r[3], r[4]) for r in self._conn().execute(
+                "SELECT a.surah, a.number_in_surah, s.english_name, s.name, a.number"
+                " FROM ayahs AS a JOIN surahs AS s ON s.number = a.surah"
+                f" WHERE a.number IN ({placeholders})", numbers)]
+        else:
+            rows = self._conn().execute(
+                "SELECT a.surah, a.number_in_surah, a.text, a.translation, s.english_name, s.name,"
+                " a.number FROM ayahs AS a JOIN surahs AS s ON s.number = a.surah"
+                f" WHERE a.number IN ({placeholders})", numbers)
+        marked = marked or {}
+        by_number = {row[6]: _result_dict(row, marked.get(row[6])) for row in rows}
+        return [by_number[n] for n in numbers if n in by_number]
+
+    def search(self, query, surah=None, offset=0, limit=20):
+        """Search ayahs for every word of ``query``, best matches first.
+
+        Uses the FTS5 index with BM25 ranking when the store has one, and a
+        substring scan of the translation otherwise. Returns ``(total,
+        results)`` where each result is the dict the search template renders;
+        its ``marked`` is the translation with the matched words wrapped in
+        the highlight markers.
+        """
+        if self.has_fts:
+            return self._search_fts(query, surah, offset, limit)
+        return self._search_like(query, surah, offset, limit)
+
+    def _search_fts(self, query, surah, offset, limit):
+        match = fts_query(query)
+        if not match:
+            return 0, []
+        where = "ayahs_fts MATCH ?"
+        args = [match]
+        if surah:
+            # Ayah numbers are contiguous per surah, so the surah filter is a
+            # rowid range the FTS cursor can apply without a join.
+            where += (" AND ayahs_fts.rowid BETWEEN"
+                      " (SELECT min(number) FROM ayahs WHERE surah = ?)"
+                      " AND (SELECT max(number) FROM ayahs WHERE surah = ?)")
+            args += [surah, surah]
+        conn = self._conn()
+        total = conn.execute(f"SELECT count(*) FROM ayahs_fts WHERE {where}", args).fetchone()[0]
+        if not total:
+            return 0, []
+        # Past the last match there is nothing to read, and an offset beyond
+        # SQLite's 64-bit integers would not bind at all.
+        numbers = [row[0] for row in conn.execute(
+            f"SELECT rowid FROM ayahs_fts WHERE {where} ORDER BY bm25(ayahs_fts) LIMIT ? OFFSET ?",
+            args + [limit, min(offset, total)])]
+        return total, self.results(numbers, self._highlight(match, numbers))
+
+    def _highlight(self, match, numbers):
+        # FTS5 marks the translation from its own match offsets; asked only
+        # for the page of results, not for every row the query matched.
+        if not numbers:
+            return {}
+        placeholders = ",".join("?" * len(numbers))
+        return dict(self._conn().execute(
+            "SELECT rowid, highlight(ayahs_fts, 0, ?, ?) FROM ayahs_fts"
+            f" WHERE ayahs_fts MATCH ? AND rowid IN ({placeholders})",
+            [MARK_START, MARK_END, match] + numbers))
+
+    def _search_like(self, query, surah, offset, limit):
+        where = "a.translation LIKE ? ESCAPE '\\'"
+        pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        args = [pattern]
+        if surah:
+            where += " AND a.surah = ?"
+            args.append(surah)
+        conn = self._conn()
+        total = conn.execute(f"SELECT count(*) FROM ayahs AS a WHERE {where}", args).fetchone()[0]
+        results = self.results(row[0] for row in conn.execute(
+            f"SELECT a.number FROM ayahs AS a WHERE {where} ORDER BY a.number LIMIT ? OFFSET ?",
+            args + [limit, min(offset, total)]))
+        pattern = term_pattern([query], whole_words=False)
+        for result in results:
+            result["marked"] = mark(result["translation"], pattern)
+        return total, results
+
+
+def _result_dict(row, marked=None):
+    return {
+        "text": row[2],
+        "translation": row[3],
+        "marked": row[3] if marked is None else marked,
+        "surah_number": row[0],
+        "surah_name": row[4],
+        "surah_name_arabic": row[5],
+        "ayah_number": row[1],
+    }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the shared store, or None if nothing has been ingested yet."""
+    global _store
+    if _store is not None:
+        return _store
+    if not os.path.exists(DEFAULT_PATH):
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = QuranStore(DEFAULT_PATH)
+    return _store
+
+
+def reset_store():
+    global _store
+    with _store_lock:
+        _store = None
@@ -0,0 +1,138 @@
+"""The 114 surahs as an immutable in-process table.
+
+Surah metadata never changes, so it is loaded once - from the local store, or
+from the API when there is none - and shared by every view. ``table[n]`` is
+surah ``n``; records are read-only ``__slots__`` objects whose attribute names
+match the API's JSON, so templates use them exactly like the dicts they
+replace.
+
+The table can also be bundled with the app: ``write_snapshot`` (run by
+``flask snapshot-surahs``) generates the ``surah_meta`` module, which is
+loaded at import time so no request - or serverless cold start - has to
+touch the store or the network for it.
+"""
+import os
+import py_compile
+
+from utils import atomic_file
+
+FIELDS = ("number", "name", "englishName", "englishNameTranslation",
+          "revelationType", "numberOfAyahs")
+
+
+class Surah:
+    __slots__ = FIELDS
+
+    def __init__(self, number, name, englishName, englishNameTranslation,
+                 revelationType, numberOfAyahs):
+        for field, value in zip(FIELDS, (number, name, englishName, englishNameTranslation,
+                                         revelationType, numberOfAyahs)):
+            object.__setattr__(self, field, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Surah records are read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError("Surah records are read-only")
+
+    def __repr__(self):
+        return f"Surah({self.number}, {self.englishName!r})"
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in FIELDS}
+
+
+class SurahTable:
+    """Surahs indexed by number, in order; built from API-shaped dicts.
+
+    ``source`` names what the table was built from (the store version, or
+    ``"api"``) so a cached table can be checked against the current data.
+    """
+
+    __slots__ = ("source", "_surahs", "_by_number", "_dicts")
+
+    def __init__(self, surahs, source=""):
+        surahs = tuple(sorted(surahs, key=lambda surah: surah.number))
+        by_number = [None] * (surahs[-1].number + 1 if surahs else 1)
+        for surah in surahs:
+            by_number[surah.number] = surah
+        self.source = source
+        self._surahs = surahs
+        self._by_number = tuple(by_number)
+        self._dicts = None
+
+    @classmethod
+    def from_dicts(cls, rows, source=""):
+        return cls((Surah(*(row.get(field) for field in FIELDS)) for row in rows), source)
+
+    def __len__(self):
+        return len(self._surahs)
+
+    def __iter__(self):
+        return iter(self._surahs)
+
+    def __getitem__(self, number):
+        surah = self.get(number)
+        if surah is None:
+            raise KeyError(number)
+        return surah
+
+    def get(self, number):
+        """Return surah ``number``, or None."""
+        if 0 < number < len(self._by_number):
+            return self._by_number[number]
+        return None
+
+    def as_dicts(self):
+        """The table as a list of API-shaped dicts, built once (for JSON)."""
+        if self._dicts is None:
+            self._dicts = [surah.as_dict() for surah in self._surahs]
+        return self._dicts
+
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "surah_meta.py")
+SURAH_COUNT = 114
+
+
+def write_snapshot(table, path=SNAPSHOT_PATH):
+    """Write ``table`` as a Python module and byte-compile it."""
+    lines = [
+        "# Generated by `flask snapshot-surahs`; do not edit.",
+        f"SOURCE = {table.source!r}",
+        "SURAHS = (",
+    ]
+    for surah in table:
+        lines.append(f"    {tuple(getattr(surah, field) for field in FIELDS)!r},")
+    lines.append(")")
+    with atomic_file(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    py_compile.compile(path, doraise=True)
+
+
+def _load_bundled():
+    try:
+        import surah_meta
+    except ImportError:
+        return None
+    return SurahTable((Surah(*row) for row in surah_meta.SURAHS), f"bundled:{surah_meta.SOURCE}")
+
+
+_bundled_table = _load_bundled()
+_api_table = None
+
+
+def bundled_table():
+    """The table from the generated ``surah_meta`` module, or None if there is none."""
+    return _bundled_table
+
+
+def api_table():
+    """The table last built from an API response, or None."""
+    return _api_table
+
+
+def share_api_table(rows):
+    """Build the table from the API's ``surah`` data and keep it for reuse."""
+    global _api_table
+    _api_table = SurahTable.from_dicts(rows, "api")
+    return _api_table
@@ -0,0 +1,69 @@
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The store and caches read their paths at import time, so point them at a
+# scratch directory before any app module is imported.
+DATA_DIR = tempfile.mkdtemp(prefix="brodeen-tests-")
+os.environ["QURAN_DB"] = os.path.join(DATA_DIR, "quran.sqlite3")
+os.environ["PDF_CACHE_DIR"] = os.path.join(DATA_DIR, "pdf_cache")
+os.environ["HADITH_SEARCH_DB"] = os.path.join(DATA_DIR, "hadith_search.sqlite3")
+os.environ.pop("APP_ENV", None)
+
+FIXTURE = os.path.join(ROOT, "data", "fixtures", "quran-sample.json")
+
+
+@pytest.fixture(scope="session")
+def store():
+    import quran_store
+    quran_store.ingest(quran_store.load_fixture(FIXTURE), path=quran_store.DEFAULT_PATH)
+    quran_store.reset_store()
+    return quran_store.get_store()
+
+
+@pytest.fixture
+def client(store):
+    import app
+    app.page_cache.clear()
+    return app.app.test_client()
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def make_pdf(path, pages):
+    """Write a minimal PDF with one line of Helvetica text per entry of ``pages``."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792]"
+                       b" /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+                       % len(objects))
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
@@ -0,0 +1,13 @@
+import arabic
+
+
+def test_normalize_strips_marks_and_folds_letters():
+    assert arabic.normalize("بِسْمِ ٱللَّهِ") == "بسم الله"
+    assert arabic.normalize("رَحْمَةٌ") == "رحمه"
+    assert arabic.normalize("هُدًى") == "هدي"
+    assert arabic.normalize("Lord of the WORLDS") == "lord of the worlds"
+
+
+def test_tokenize():
+    assert arabic.tokenize("ٱلْحَمْدُ لِلَّهِ رَبِّ ٱلْعَٰلَمِينَ") == ["الحمد", "لله", "رب", "العلمين"]
+    assert arabic.tokenize("Say, \"He is Allah, [who is] One,\"") == ["say", "he", "is", "allah", "who", "is", "one"]
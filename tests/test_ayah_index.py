@@ -0,0 +1,37 @@
+from array import array
+
+from ayah_index import AyahIndex, intersect, parse_query
+
+
+def test_intersect():
+    assert intersect([]) == []
+    assert list(intersect([[1, 2, 3]])) == [1, 2, 3]
+    assert list(intersect([[1, 3, 5, 7, 9], [3, 4, 9], [0, 3, 9, 10]])) == [3, 9]
+    assert list(intersect([[1, 2], [3, 4]])) == []
+
+
+def test_intersect_long_and_short_lists():
+    long = array("I", range(0, 100000, 2))
+    assert list(intersect([long, [5, 10, 99998, 99999]])) == [10, 99998]
+    assert list(intersect([memoryview(long), [4]])) == [4]
+
+
+def test_parse_query():
+    assert parse_query("Mercy lord OR refuge") == [["mercy", "lord"], ["refuge"]]
+    assert parse_query("OR lord OR") == [["lord"]]
+
+
+def test_index_search(store, tmp_path):
+    index = AyahIndex.build(store.ayah_rows(), version=store.version)
+    refuge = index.search("refuge")
+    assert len(refuge) == 3
+    assert list(index.search("Lord daybreak")) == list(index.search("daybreak"))
+    assert len(index.search("daybreak OR jinn")) == 2
+    assert len(index.search("refuge", surah=113)) == 1
+    assert index.search("refuge", surah=200) == []
+
+    path = str(tmp_path / "index.pickle")
+    index.save(path)
+    loaded = AyahIndex.load(path, version=store.version)
+    assert list(loaded.search("refuge")) == list(refuge)
+    assert AyahIndex.load(path, version="other") is None
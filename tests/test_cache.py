@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+from cache import SingleFlight, TTLCache, make_key
+from conftest import wait_until
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_make_key_normalizes_params():
+    assert make_key("/search/", {"q": " lord ", "surah": "", "offset": 0}) == "search?offset=0&q=lord"
+    assert make_key("surah", {"surah": None}) == "surah"
+
+
+def test_ttl_expiry():
+    clock = Clock()
+    cache = TTLCache(default_ttl=10, clock=clock)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    clock.now = 10
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = TTLCache(max_entries=2, sizer=len)
+    cache.set("a", "x")
+    cache.set("b", "x")
+    cache.get("a")
+    cache.set("c", "x")
+    assert "a" in cache and "c" in cache and "b" not in cache
+
+    cache = TTLCache(max_bytes=5, sizer=len)
+    cache.set("a", "xxx")
+    cache.set("b", "xxx")
+    assert "a" not in cache and "b" in cache
+    assert cache.set("c", "xxxxxx") is False
+
+
+def test_stale_entries_are_only_returned_by_lookup():
+    clock = Clock()
+    cache = TTLCache(default_ttl=10, clock=clock)
+    cache.set("a", 1, stale_ttl=5)
+    clock.now = 12
+    assert cache.get("a") is None
+    assert cache.lookup("a") == (1, True)
+    clock.now = 15
+    assert cache.lookup("a") is None
+
+
+def test_single_flight_shares_one_call():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "done"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", work)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("k", work)))
+                 for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    wait_until(lambda: flight.stats()["shared"] == 4)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+    assert results == ["done"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "shared": 4}
+
+
+def test_single_flight_shares_errors_and_forgets_them():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("upstream down")
+
+    with pytest.raises(ValueError):
+        flight.do("k", fail)
+    assert flight.do("k", lambda: 2) == 2
@@ -0,0 +1,38 @@
+import pytest
+
+from corpus import Corpus, CorpusError, write_corpus
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "texts.corpus")
+    rows = [("بِسْمِ ٱللَّهِ", "In the name of Allah"), ("", "empty first field"),
+            ("قُلْ", "Say")]
+    write_corpus(path, "v1", [1, 2, 3], rows)
+    corpus = Corpus(path)
+    assert corpus.version == "v1"
+    assert len(corpus) == 3
+    assert [corpus.record(corpus.find(key)) for key in (1, 2, 3)] == rows
+    assert corpus.find(0) is None and corpus.find(4) is None
+    corpus.close()
+
+
+def test_sparse_keys(tmp_path):
+    path = str(tmp_path / "sparse.corpus")
+    write_corpus(path, "v2", [2, 7, 6222], [("a",), ("b",), ("c",)])
+    corpus = Corpus(path)
+    assert corpus.field(corpus.find(6222), 0) == "c"
+    assert corpus.key(corpus.find(7)) == 7
+    assert corpus.find(3) is None
+    corpus.close()
+
+
+def test_rejects_unsorted_keys(tmp_path):
+    with pytest.raises(CorpusError):
+        write_corpus(str(tmp_path / "bad.corpus"), "v", [2, 1], [("a",), ("b",)])
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not.corpus"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(CorpusError):
+        Corpus(str(path))
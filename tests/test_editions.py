@@ -0,0 +1,45 @@
+import app
+
+
+def fetched(identifier, name, texts, direction="ltr"):
+    return {identifier: {"edition": {"identifier": identifier, "englishName": name,
+                                     "direction": direction},
+                         "ayahs": [{"text": text} for text in texts]}}
+
+
+def test_parse_editions():
+    assert app.parse_editions(" EN.sahih,ur.jalandhry,en.sahih,bad,../x") == ["en.sahih", "ur.jalandhry"]
+    assert app.parse_editions("") == []
+    assert len(app.parse_editions(",".join(f"en.e{n}" for n in range(10)))) == app.MAX_EDITIONS
+
+
+def test_join_editions():
+    ayahs = [{"translation": "one"}, {"translation": "two"}]
+    editions = ["en.sahih", "ur.jalandhry", "fr.hamidullah"]
+    joined = list(app.join_editions(ayahs, editions, fetched("ur.jalandhry", "Jalandhry", ["ek"], "rtl"),
+                                    local=True))
+    assert joined[0]["translations"] == [
+        {"name": "Saheeh International", "direction": "ltr", "text": "one"},
+        {"name": "Jalandhry", "direction": "rtl", "text": "ek"},
+    ]
+    # An edition with fewer ayahs than the surah is left out of the rest
+    assert [t["text"] for t in joined[1]["translations"]] == ["two"]
+    # The ayahs may be shared cache entries and are left untouched
+    assert ayahs == [{"translation": "one"}, {"translation": "two"}]
+
+
+def test_join_editions_without_local_translation():
+    # An API surah's own translation is not the requested edition
+    joined = list(app.join_editions([{"translation": "one"}], ["en.sahih"], {}, local=False))
+    assert joined[0]["translations"] == []
+
+
+def test_surah_page_with_editions(client, monkeypatch):
+    async def fetch_surah_editions(number, editions):
+        return fetched("ur.jalandhry", "Jalandhry", ["ek", "do", "teen", "char"], "rtl")
+
+    monkeypatch.setattr(app, "fetch_surah_editions", fetch_surah_editions)
+    body = client.get("/surah/112?editions=en.sahih,ur.jalandhry,fr.hamidullah").get_data(as_text=True)
+    assert "Jalandhry" in body and "teen" in body
+    assert "Eternal Refuge" in body
+    assert "fr.hamidullah" in body
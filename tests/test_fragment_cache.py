@@ -0,0 +1,28 @@
+from jinja2 import DictLoader, Environment
+
+from fragment_cache import FragmentCacheExtension, fragments
+
+TEMPLATES = {"grid.html": '{% cache "grid", version %}{{ items|join(",") }}{% endcache %}'}
+
+
+def make_env(auto_reload):
+    return Environment(loader=DictLoader(TEMPLATES), extensions=[FragmentCacheExtension],
+                       auto_reload=auto_reload)
+
+
+def test_fragment_is_rendered_once_per_key():
+    fragments.clear()
+    template = make_env(auto_reload=False).get_template("grid.html")
+    assert template.render(items=[1, 2], version="v1") == "1,2"
+    # Same key: the cached fragment, whatever the context
+    assert template.render(items=[3], version="v1") == "1,2"
+    assert template.render(items=[3], version="v2") == "3"
+    assert len(fragments) == 2
+
+
+def test_fragments_are_not_cached_while_templates_reload():
+    fragments.clear()
+    template = make_env(auto_reload=True).get_template("grid.html")
+    assert template.render(items=[1], version="v1") == "1"
+    assert template.render(items=[2], version="v1") == "2"
+    assert len(fragments) == 0
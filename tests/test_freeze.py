@@ -0,0 +1,59 @@
+import os
+
+from freeze import freeze, output_path, template_hash
+
+
+def test_output_path():
+    assert output_path("/") == "index.html"
+    assert output_path("/surah/2") == os.path.join("surah", "2", "index.html")
+    assert output_path("/bukhari/page/3") == os.path.join("bukhari", "page", "3", "index.html")
+
+
+def test_template_hash_follows_the_layout(client):
+    env = client.application.jinja_env
+    assert template_hash(env, "surah.html") == template_hash(env, "surah.html")
+    assert template_hash(env, "surah.html") != template_hash(env, "search.html")
+
+
+def test_freeze_is_incremental(client, tmp_path):
+    app = client.application
+    output = str(tmp_path / "build")
+    pages = [("/", "index.html", "v1"), ("/surah/112", "surah.html", "v1")]
+    assert freeze(app, pages, output) == (2, 0, 0, [])
+    with open(os.path.join(output, "surah", "112", "index.html"), encoding="utf-8") as f:
+        assert "Eternal Refuge" in f.read()
+    assert os.path.exists(os.path.join(output, "static"))
+
+    assert freeze(app, pages, output) == (0, 2, 0, [])
+    pages[1] = ("/surah/112", "surah.html", "v2")
+    assert freeze(app, pages, output) == (1, 1, 0, [])
+
+    # Dropped pages are deleted and failures are retried on the next run
+    pages = [("/", "index.html", "v1"), ("/surah/2", "surah.html", "v1")]
+    assert freeze(app, pages, output) == (0, 1, 1, [("/surah/2", 404)])
+    assert not os.path.exists(os.path.join(output, "surah", "112", "index.html"))
+    assert freeze(app, pages, output) == (0, 1, 0, [("/surah/2", 404)])
+
+
+def test_freeze_command(client, tmp_path, monkeypatch):
+    import app
+    monkeypatch.setattr(app, "HADITH_COLLECTIONS", {})
+    output = str(tmp_path / "site")
+    result = client.application.test_cli_runner().invoke(
+        args=["freeze", "--output", output, "--workers", "1"])
+    assert result.exit_code == 0, result.output
+    assert "5 pages rendered" in result.output
+    assert os.path.exists(os.path.join(output, "surah", "114", "index.html"))
+
+
+def test_frozen_hadith_pages_use_path_urls(store, tmp_path, monkeypatch):
+    import app
+    import pdf_text
+    from conftest import make_pdf
+    monkeypatch.setattr(pdf_text, "CACHE_DIR", str(tmp_path / "cache"))
+    pdf = make_pdf(str(tmp_path / "muslim.pdf"), ["Hadith 1", "Narrated Anas: One.",
+                                                 "Hadith 2", "Narrated Jabir: Two."])
+    monkeypatch.setattr(app, "HADITH_COLLECTIONS", {"muslim": pdf})
+    urls = [url for url, _, _ in app.frozen_pages(store) if url.startswith("/muslim")]
+    assert urls == ["/muslim", "/muslim/page/2", "/muslim/page/3", "/muslim/page/4",
+                    "/muslim/1", "/muslim/2"]
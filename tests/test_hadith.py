@@ -0,0 +1,96 @@
+from hadith import HadithIndex, segment
+from conftest import make_pdf
+
+BUKHARI = b"""Book 1: Revelation
+Volume 1, Book 1, Number 1:
+Narrated Umar bin Al-Khattab: Actions are judged by intentions.
+Volume 1, Book 1, Number 2:
+Narrated Aisha: The revelation came.
+Book 2: Belief
+Chapter 1: Faith
+Volume 1, Book 2, Number 1:
+Narrated Ibn Umar: Islam is based on five.
+Volume 1, Book 2, Number 7:
+Narrated Anas: None of you will have faith.
+"""
+
+TIRMIDHI = b"""Hadith 1
+It was narrated from Abu Hurairah that the Prophet said one thing.
+Hadith No. 2:
+Narrated Jabir: Another thing.
+"""
+
+
+def test_segment_references():
+    records = segment(BUKHARI)
+    assert [record[:3] for record in records] == [(1, 1, 1), (2, 1, 1), (1, 1, 2), (7, 1, 2)]
+    number, volume, book, title, chapter, narrator, start, end = records[2]
+    assert (title, chapter, narrator) == ("Belief", "Faith", "Ibn Umar")
+    assert BUKHARI[start:end].strip().endswith(b"based on five.")
+
+
+def test_segment_hadith_headings():
+    records = segment(TIRMIDHI)
+    assert [(record[0], record[5]) for record in records] == [(1, "Abu Hurairah"), (2, "Jabir")]
+
+
+def test_index_sequential_numbering_and_references(tmp_path):
+    index = HadithIndex.build(BUKHARI, source="sha")
+    assert index.numbering == "sequential"
+    row = index.find(4)
+    assert index.record(row) == {"number": 4, "printed": 7, "volume": 1, "book": 2,
+                                 "book_title": "Belief", "chapter": "Faith",
+                                 "narrator": "Anas"}
+    assert index.find_reference(2, 7) == row
+    assert index.find_reference(3, 1) is None
+    assert index.read(row, BUKHARI) == "Narrated Anas: None of you will have faith."
+
+    path = str(tmp_path / "bukhari.hadith")
+    index.save(path)
+    loaded = HadithIndex.load(path, "sha")
+    assert loaded.record(loaded.find_reference(1, 2)) == index.record(1)
+    assert HadithIndex.load(path, "other") is None
+
+
+def test_index_printed_numbering():
+    index = HadithIndex.build(TIRMIDHI)
+    assert index.numbering == "printed"
+    assert index.find(2) == 1
+    assert index.find(3) is None
+
+
+def test_hadith_route(client, tmp_path, monkeypatch):
+    import app
+    import pdf_text
+    monkeypatch.setattr(pdf_text, "CACHE_DIR", str(tmp_path / "cache"))
+    pdf = make_pdf(str(tmp_path / "tirmidhi.pdf"), ["Hadith 1", "Narrated Jabir: One thing.",
+                                                    "Hadith 2", "Narrated Anas: Another."])
+    monkeypatch.setitem(app.HADITH_COLLECTIONS, "tirmidhi", pdf)
+    body = client.get("/tirmidhi/2").get_data(as_text=True)
+    assert "Narrated Anas: Another." in body and "One thing" not in body
+    assert client.get("/tirmidhi/3").status_code == 404
+
+
+def test_hadith_reference_route(client, tmp_path, monkeypatch):
+    import app
+    import pdf_text
+    monkeypatch.setattr(pdf_text, "CACHE_DIR", str(tmp_path / "cache"))
+    pdf = make_pdf(str(tmp_path / "bukhari.pdf"), BUKHARI.decode().splitlines())
+    monkeypatch.setitem(app.HADITH_COLLECTIONS, "bukhari", pdf)
+    body = client.get("/bukhari/2/7").get_data(as_text=True)
+    assert "None of you will have faith." in body
+    assert "Volume 1, Book 2, Number 7" in body
+    assert client.get("/bukhari/2/8").status_code == 404
+
+
+def test_oversized_numbers_are_not_headings():
+    text = b"Hadith 1\nFirst.\nHadith 50000000\nSecond.\nHadith 99999999999\nThird.\nHadith 999999\nLast.\n"
+    index = HadithIndex.build(text)
+    assert [index.printed[row] for row in range(len(index))] == [1, 999999]
+    assert index.find(999999) == 1
+    assert index.find(50000000) is None
+    assert "Hadith 50000000" in index.read(0, text)
+
+    text = b"Book 1, Number 99999999999:\nNarrated Anas: Too long.\n"
+    assert HadithIndex.build(text).numbering == "printed"
+    assert len(HadithIndex.build(text)) == 0
@@ -0,0 +1,94 @@
+import os
+
+import pytest
+
+import pdf_text
+from conftest import make_pdf, wait_until
+from hadith_search import MARK_END, MARK_START, HadithSearch
+
+
+@pytest.fixture
+def collections(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_text, "CACHE_DIR", str(tmp_path / "cache"))
+    return {
+        "bukhari": make_pdf(str(tmp_path / "bukhari.pdf"),
+                            ["Hadith 1", "Narrated Umar: Actions are judged by intentions.",
+                             "Hadith 2", "Narrated Aisha: The revelation came in dreams."]),
+        "muslim": make_pdf(str(tmp_path / "muslim.pdf"),
+                           ["Hadith 1", "Narrated Abu Hurairah: Faith has over seventy branches."]),
+    }
+
+
+def test_search(collections, tmp_path):
+    index = HadithSearch(str(tmp_path / "search.sqlite3"))
+    index.sync(collections, pdf_text.PDFTextCache())
+    total, results = index.search("revelation")
+    assert total == 1
+    assert (results[0]["collection"], results[0]["kind"], results[0]["number"]) == ("bukhari", "hadith", 2)
+    assert MARK_START + "revelation" + MARK_END in results[0]["snippet"]
+    assert index.search("narrated")[0] == 3
+    assert index.search("narrated", collection="muslim")[0] == 1
+    assert index.search("()") == (0, [])
+
+
+def test_sync_reindexes_only_changed_collections(collections, tmp_path):
+    path = str(tmp_path / "search.sqlite3")
+    cache = pdf_text.PDFTextCache()
+    HadithSearch(path).sync(collections, cache)
+
+    st = os.stat(collections["muslim"])
+    make_pdf(collections["muslim"], ["Hadith 1", "Narrated Jabir: Modesty is part of faith."])
+    os.utime(collections["muslim"], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    index = HadithSearch(path)
+    index.sync(collections, cache)
+    assert index.search("modesty")[0] == 1
+    assert index.search("seventy")[0] == 0
+    assert index.search("revelation")[0] == 1
+
+    # A collection that is no longer configured is dropped from the index
+    index.sync({"bukhari": collections["bukhari"]}, cache)
+    assert index.search("modesty")[0] == 0
+
+
+def test_search_view(client, collections, tmp_path, monkeypatch):
+    import app
+    monkeypatch.setattr(app, "HADITH_COLLECTIONS", collections)
+    index = HadithSearch(str(tmp_path / "search.sqlite3"))
+    monkeypatch.setattr(app, "hadith_search", index)
+    # The first search finds the index empty and starts building it
+    assert "No results found" in client.get("/hadith/search?q=revelation").get_data(as_text=True)
+    wait_until(lambda: index._refresher is not None and not index._refresher.is_alive())
+    body = client.get("/hadith/search?q=revelation").get_data(as_text=True)
+    assert '<span class="highlight">revelation</span>' in body
+    assert "No results found" in client.get("/hadith/search?q=zakat").get_data(as_text=True)
+
+
+def test_search_offset_past_the_end(collections, tmp_path):
+    index = HadithSearch(str(tmp_path / "search.sqlite3"))
+    index.sync(collections, pdf_text.PDFTextCache())
+    assert index.search("narrated", offset=10**20) == (3, [])
+
+
+def test_refresh_only_when_a_collection_changed(collections, tmp_path):
+    cache = pdf_text.PDFTextCache()
+    index = HadithSearch(str(tmp_path / "search.sqlite3"))
+    index.sync(collections, cache)
+    assert index.refresh(collections, cache) is None
+
+    st = os.stat(collections["muslim"])
+    make_pdf(collections["muslim"], ["Hadith 1", "Narrated Jabir: Modesty is part of faith."])
+    os.utime(collections["muslim"], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    thread = index.refresh(collections, cache)
+    thread.join()
+    assert index.search("modesty")[0] == 1
+    assert index.refresh(collections, cache) is None
+
+
+def test_markers_in_the_pdf_text_are_not_indexed(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_text, "CACHE_DIR", str(tmp_path / "cache"))
+    pdf = make_pdf(str(tmp_path / "bukhari.pdf"), ["Hadith 1", "Narrated Umar: \x02Actions\x03 count."])
+    index = HadithSearch(str(tmp_path / "search.sqlite3"))
+    index.sync({"bukhari": pdf}, pdf_text.PDFTextCache())
+    total, results = index.search("actions")
+    assert total == 1
+    assert results[0]["snippet"].count(MARK_START) == results[0]["snippet"].count(MARK_END) == 1
@@ -0,0 +1,25 @@
+from highlight import MARK_END, MARK_START, mark, strip_markers, term_pattern
+
+
+def test_mark_whole_words():
+    pattern = term_pattern(["lord", "men"])
+    assert mark("Lord of mankind, of men", pattern) == (
+        f"{MARK_START}Lord{MARK_END} of mankind, of {MARK_START}men{MARK_END}")
+
+
+def test_mark_substrings():
+    pattern = term_pattern(["ref"], whole_words=False)
+    assert mark("the Eternal Refuge", pattern) == f"the Eternal {MARK_START}Ref{MARK_END}uge"
+
+
+def test_nothing_to_mark():
+    assert term_pattern(["", ""]) is None
+    assert mark("text", None) == "text"
+    assert mark("", term_pattern(["a"])) == ""
+
+
+def test_markers_in_the_text_are_stripped():
+    text = f"a {MARK_START}<b>{MARK_END} lord"
+    assert strip_markers(text) == "a <b> lord"
+    assert mark(text, None) == "a <b> lord"
+    assert mark(text, term_pattern(["lord"])) == f"a <b> {MARK_START}lord{MARK_END}"
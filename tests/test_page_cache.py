@@ -0,0 +1,55 @@
+import app
+
+
+def test_etag_and_304(client):
+    first = client.get("/surah/1")
+    assert first.status_code == 200
+    body = first.get_data()
+    second = client.get("/surah/1")
+    etag = second.headers["ETag"]
+    assert second.get_data() == body
+    assert second.last_modified is not None
+
+    not_modified = client.get("/surah/1", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.get_data() == b""
+
+    changed = client.get("/surah/1", headers={"If-None-Match": '"other"'})
+    assert changed.status_code == 200
+
+
+def test_pages_are_keyed_by_view_arguments(client):
+    client.get("/surah/112").get_data()
+    client.get("/surah/113").get_data()
+    client.get("/surah/112").get_data()
+    assert len(app.page_cache) == 2
+
+
+def test_unread_query_arguments_share_an_entry(client):
+    for url in ("/", "/?x=1", "/?utm_source=mail"):
+        response = client.get(url)
+        assert response.status_code == 200
+        response.get_data()
+    assert len(app.page_cache) == 1
+
+
+def test_editions_are_normalized_in_the_key(client):
+    client.get("/surah/1?editions=en.sahih").get_data()
+    client.get("/surah/1?editions=EN.SAHIH,").get_data()
+    assert len(app.page_cache) == 1
+
+
+def test_missing_editions_are_not_cached(client, monkeypatch):
+    async def fetch_surah_editions(number, editions):
+        return {}
+
+    monkeypatch.setattr(app, "fetch_surah_editions", fetch_surah_editions)
+    client.get("/surah/1?editions=ur.jalandhry").get_data()
+    assert len(app.page_cache) == 0
+
+
+def test_disabled(client, monkeypatch):
+    monkeypatch.setitem(app.app.config, "PAGE_CACHE", False)
+    response = client.get("/")
+    assert "ETag" not in response.headers
+    assert len(app.page_cache) == 0
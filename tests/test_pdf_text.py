@@ -0,0 +1,150 @@
+import os
+import threading
+
+import pytest
+
+import pdf_text
+from conftest import make_pdf
+
+
+@pytest.fixture
+def pdf(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_text, "CACHE_DIR", str(tmp_path / "cache"))
+    return make_pdf(str(tmp_path / "bukhari.pdf"), ["Hadith 1 first", "Hadith 2 second"])
+
+
+def test_text_is_extracted_once(pdf):
+    cache = pdf_text.PDFTextCache()
+    assert cache.page_count(pdf) == 2
+    assert cache.page(pdf, 1).strip() == "Hadith 1 first"
+    assert cache.page(pdf, 2).strip() == "Hadith 2 second"
+    assert cache.extractions == 1
+
+    # A new process reads the text written by the first one
+    fresh = pdf_text.PDFTextCache()
+    assert fresh.page(pdf, 2).strip() == "Hadith 2 second"
+    assert fresh.extractions == 0
+
+
+def test_page_offsets(pdf):
+    cache = pdf_text.PDFTextCache()
+    assert "first" in cache.pages(pdf, 1, 2) and "second" in cache.pages(pdf, 1, 2)
+    assert cache.page(pdf, 0) is None
+    assert cache.page(pdf, 3) is None
+    assert cache.pages(pdf, 2, 1) is None
+
+
+def test_touched_pdf_keeps_cache(pdf):
+    pdf_text.PDFTextCache().meta(pdf)
+    st = os.stat(pdf)
+    os.utime(pdf, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    cache = pdf_text.PDFTextCache()
+    assert "Hadith 1" in cache.page(pdf, 1)
+    assert cache.extractions == 0
+
+
+def test_changed_pdf_is_extracted_again(pdf):
+    cache = pdf_text.PDFTextCache()
+    cache.meta(pdf)
+    st = os.stat(pdf)
+    make_pdf(pdf, ["Hadith 1 revised and longer"])
+    os.utime(pdf, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert cache.page_count(pdf) == 1
+    assert "revised" in cache.page(pdf, 1)
+    assert cache.extractions == 2
+
+
+def test_missing_pdf(tmp_path):
+    cache = pdf_text.PDFTextCache()
+    assert cache.meta(str(tmp_path / "missing.pdf")) is None
+    assert cache.page_count(str(tmp_path / "missing.pdf")) == 0
+
+
+def test_shards_cover_every_page():
+    shards = pdf_text._shards(10, 2)
+    assert shards[0][0] == 0 and shards[-1][1] == 10
+    assert all(a[1] == b[0] for a, b in zip(shards, shards[1:]))
+    assert pdf_text._shards(1, 8) == [(0, 1)]
+
+
+def test_parallel_extraction_matches_serial(tmp_path):
+    path = make_pdf(str(tmp_path / "long.pdf"), [f"Hadith {n} page" for n in range(1, 11)])
+    seen = []
+    pages, failures = pdf_text.extract_pages(path, workers=2,
+                                             progress=lambda done, total: seen.append((done, total)))
+    assert failures == []
+    assert pages == pdf_text.extract_pages(path)[0]
+    assert [text.strip() for text in pages] == [f"Hadith {n} page" for n in range(1, 11)]
+    assert seen[-1] == (10, 10)
+
+
+def test_warm_hadith_command(pdf, monkeypatch):
+    import app
+    monkeypatch.setitem(app.HADITH_COLLECTIONS, "bukhari", pdf)
+    result = app.app.test_cli_runner().invoke(args=["warm-hadith", "--workers", "1", "bukhari"])
+    assert result.exit_code == 0
+    assert "2 pages cached" in result.output
+    result = app.app.test_cli_runner().invoke(args=["warm-hadith", "nawawi"])
+    assert result.exit_code != 0
+
+
+def test_hadith_page_route(pdf, client, monkeypatch):
+    import app
+    monkeypatch.setitem(app.HADITH_COLLECTIONS, "bukhari", pdf)
+    assert "Hadith 1 first" in client.get("/bukhari").get_data(as_text=True)
+    assert "Hadith 2 second" in client.get("/bukhari/page/2").get_data(as_text=True)
+    assert client.get("/bukhari/page/3").status_code == 404
+    # Old query string links are redirected to the path URL
+    legacy = client.get("/bukhari?page=2")
+    assert legacy.status_code == 301
+    assert legacy.headers["Location"].endswith("/bukhari/page/2")
+
+
+def test_unwritable_cache_keeps_the_text_in_memory(tmp_path, monkeypatch):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    monkeypatch.setattr(pdf_text, "CACHE_DIR", str(blocker / "cache"))
+    pdf = make_pdf(str(tmp_path / "bukhari.pdf"), ["Hadith 1 first", "Hadith 2 second"])
+    cache = pdf_text.PDFTextCache()
+    assert cache.page_count(pdf) == 2
+    assert cache.page(pdf, 2).strip() == "Hadith 2 second"
+    assert cache.page(pdf, 1).strip() == "Hadith 1 first"
+    assert cache.extractions == 1
+
+
+def test_unwritable_cache_still_serves_pages(client, tmp_path, monkeypatch):
+    import app
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    monkeypatch.setattr(pdf_text, "CACHE_DIR", str(blocker / "cache"))
+    pdf = make_pdf(str(tmp_path / "bukhari.pdf"), ["Hadith 1", "Narrated Anas: One."])
+    monkeypatch.setitem(app.HADITH_COLLECTIONS, "bukhari", pdf)
+    assert "Hadith 1" in client.get("/bukhari").get_data(as_text=True)
+    assert "Narrated Anas: One." in client.get("/bukhari/1").get_data(as_text=True)
+
+
+def test_waiting_process_uses_the_cache_written_meanwhile(pdf, monkeypatch):
+    lock_path = os.path.splitext(pdf_text._cache_paths(pdf)[0])[0] + ".lock"
+    os.makedirs(os.path.dirname(lock_path))
+    waiting = threading.Event()
+    flock = pdf_text.fcntl.flock
+
+    def traced_flock(fd, operation):
+        waiting.set()
+        flock(fd, operation)
+
+    monkeypatch.setattr(pdf_text.fcntl, "flock", traced_flock)
+    cache = pdf_text.PDFTextCache()
+    with open(lock_path, "ab") as held:
+        flock(held.fileno(), pdf_text.fcntl.LOCK_EX)
+        thread = threading.Thread(target=cache.meta, args=(pdf,))
+        thread.start()
+        assert waiting.wait(5)
+        # Meanwhile the process holding the lock extracts the PDF
+        other = pdf_text.PDFTextCache()
+        st = os.stat(pdf)
+        other._extract(pdf, (st.st_size, st.st_mtime_ns), 1, None)
+    thread.join(5)
+    assert other.extractions == 1
+    assert cache.extractions == 0
+    assert cache.page(pdf, 1).strip() == "Hadith 1 first"
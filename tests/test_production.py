@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+
+from jinja2 import FileSystemBytecodeCache
+
+import app
+from conftest import ROOT
+
+
+def test_development_mode_reloads_templates():
+    assert not app.app.config["PRODUCTION"]
+    assert app.app.config["TEMPLATES_AUTO_RELOAD"]
+
+
+def test_production_mode_compiles_templates_at_startup(tmp_path):
+    cache_dir = tmp_path / "jinja"
+    env = dict(os.environ, APP_ENV="production", TEMPLATE_CACHE_DIR=str(cache_dir))
+    code = ("import app; env = app.app.jinja_env;"
+            " print(env.auto_reload, len(env.cache), len(env.list_templates()))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout.split()
+    assert out[0] == "False"
+    assert out[1] == out[2]
+    assert len(os.listdir(cache_dir)) == int(out[2])
+
+
+def test_bytecode_cache_falls_back_when_the_directory_cannot_be_created(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache = app.template_bytecode_cache(str(blocker / "jinja"))
+    assert isinstance(cache, FileSystemBytecodeCache)
+    assert cache.directory != str(blocker / "jinja")
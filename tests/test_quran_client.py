@@ -0,0 +1,173 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+import requests
+
+from cache import TTLCache
+from conftest import wait_until
+from quran_client import CACHE_TTL, QuranAPI, QuranClient
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+        self.fail = False
+        self.gate = None
+
+    def get_json(self, endpoint, params=None):
+        self.calls.append(endpoint)
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail:
+            raise requests.exceptions.ConnectionError("upstream down")
+        return {"data": len(self.calls)}
+
+
+class FakeAsyncClient:
+    def __init__(self):
+        self.calls = []
+        self.pending = []
+
+    def submit(self, endpoint, params=None):
+        self.calls.append(endpoint)
+        future = Future()
+        self.pending.append(future)
+        return future
+
+
+def make_api(clock, async_client=None):
+    client = FakeClient()
+    api = QuranAPI(client, TTLCache(clock=clock), stale_ttl=100, failure_ttl=30,
+                   async_client=async_client)
+    return client, api
+
+
+def test_fresh_entries_are_served_from_the_cache():
+    client, api = make_api(Clock())
+    assert api.get("surah") == {"data": 1}
+    assert api.get("surah") == {"data": 1}
+    assert client.calls == ["surah"]
+
+
+def test_stale_entries_are_served_while_refreshing():
+    clock = Clock()
+    client, api = make_api(clock)
+    api.get("surah")
+    clock.now = CACHE_TTL + 50
+    assert api.get("surah") == {"data": 1}
+    api._executor.shutdown(wait=True)
+    assert api.refreshes == 1
+    assert api.get("surah") == {"data": 2}
+
+
+def test_failures_are_remembered():
+    client, api = make_api(Clock())
+    client.fail = True
+    assert api.get("surah/1") is None
+    assert api.get("surah/1") is None
+    assert client.calls == ["surah/1"]
+    assert api.failure_hits == 1
+
+
+def test_failed_refresh_keeps_serving_the_stale_entry():
+    clock = Clock()
+    client, api = make_api(clock)
+    api.get("surah")
+    client.fail = True
+    clock.now = CACHE_TTL + 50
+    assert api.get("surah") == {"data": 1}
+    api._executor.shutdown(wait=True)
+    assert api.get("surah") == {"data": 1}
+    assert len(client.calls) == 2
+
+
+def test_concurrent_misses_share_one_upstream_call():
+    client, api = make_api(Clock())
+    client.gate = threading.Event()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(api.get("surah")))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: api.flights.stats()["shared"] == 4)
+    client.gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == [{"data": 1}] * 5
+    assert client.calls == ["surah"]
+
+
+def test_async_misses_share_one_upstream_call():
+    async_client = FakeAsyncClient()
+    client, api = make_api(Clock(), async_client)
+
+    async def main():
+        views = asyncio.gather(*(api.get_async("surah") for _ in range(3)))
+        await asyncio.sleep(0)
+        async_client.pending[0].set_result({"data": "async"})
+        return await views
+
+    assert asyncio.run(main()) == [{"data": "async"}] * 3
+    assert async_client.calls == ["surah"]
+    # The answer went into the same cache the sync path reads
+    assert api.get("surah") == {"data": "async"}
+    assert client.calls == []
+
+
+def test_async_failures_are_remembered():
+    async_client = FakeAsyncClient()
+    _, api = make_api(Clock(), async_client)
+
+    async def main():
+        view = asyncio.ensure_future(api.get_async("surah/1"))
+        await asyncio.sleep(0)
+        async_client.pending[0].set_exception(aiohttp.ClientError("upstream down"))
+        return await view, await api.get_async("surah/1")
+
+    assert asyncio.run(main()) == (None, None)
+    assert async_client.calls == ["surah/1"]
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps({"data": self.path}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_busy_pool_does_not_block():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), JSONHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = QuranClient(base_url=f"http://127.0.0.1:{server.server_port}/", pool_maxsize=1)
+        assert client.get_json("surah") == {"data": "/surah"}
+        pool = client.session.get_adapter(client.base_url).poolmanager.connection_from_url(client.base_url)
+        held = pool._get_conn()
+        results = []
+        thread = threading.Thread(target=lambda: results.append(client.get_json("juz")), daemon=True)
+        thread.start()
+        thread.join(5)
+        assert results == [{"data": "/juz"}]
+        pool._put_conn(held)
+        client.reset()
+    finally:
+        server.shutdown()
+        server.server_close()
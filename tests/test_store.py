@@ -0,0 +1,127 @@
+import quran_store
+from highlight import MARK_END, MARK_START
+from conftest import FIXTURE
+
+
+def test_ingest_counts(tmp_path):
+    path = str(tmp_path / "quran.sqlite3")
+    assert quran_store.ingest(quran_store.load_fixture(FIXTURE), path=path) == (4, 22)
+
+
+def test_ingest_strips_markers(tmp_path):
+    editions = quran_store.load_fixture(FIXTURE)
+    ayah = editions[quran_store.TRANSLATION_EDITION]["surahs"][1]["ayahs"][1]
+    ayah["text"] = f"Allah, the {MARK_START}Eternal{MARK_END} Refuge."
+    path = str(tmp_path / "quran.sqlite3")
+    quran_store.ingest(editions, path=path)
+    surah = quran_store.QuranStore(path).surah(112)
+    assert surah["ayahs"][1]["translation"] == "Allah, the Eternal Refuge."
+
+
+def test_surahs(store):
+    surahs = store.surahs()
+    assert [surah.number for surah in surahs] == [1, 112, 113, 114]
+    assert surahs[1].englishName == "Al-Faatiha"
+    assert surahs[1].numberOfAyahs == 7
+    assert surahs.source == store.version
+    assert store.surah_info(113)["englishName"] == "Al-Falaq"
+
+
+def test_surah(store):
+    surah = store.surah(112)
+    assert [ayah["numberInSurah"] for ayah in surah["ayahs"]] == [1, 2, 3, 4]
+    assert surah["ayahs"][1]["translation"] == "Allah, the Eternal Refuge."
+    assert surah["ayahs"][1]["text"]
+    assert store.surah(2) is None
+
+
+def refs(results):
+    return sorted((r["surah_number"], r["ayah_number"]) for r in results)
+
+
+def test_fts_query():
+    assert quran_store.fts_query('lord of "daybreak"') == '"lord" "of" "daybreak"'
+    assert quran_store.fts_query("NOT -*") == '"not"'
+    assert quran_store.fts_query("()") == ""
+
+
+def test_search(store):
+    assert store.has_fts
+    total, results = store.search("REFUGE")
+    assert total == 3
+    assert refs(results) == [(112, 2), (113, 1), (114, 1)]
+    assert results[0]["surah_name"]
+    assert store.search("refuge", surah=113)[0] == 1
+    assert store.search("lord daybreak")[0] == 1
+    assert store.search("100%")[0] == 0
+    assert store.search("daybreak OR jinn")[0] == 2
+
+
+def test_search_pages(store):
+    total, first = store.search("evil", limit=4)
+    _, rest = store.search("evil", offset=4, limit=4)
+    assert total == 6
+    assert len(first) == 4 and len(rest) == 2
+    assert not set(refs(first)) & set(refs(rest))
+
+
+def test_search_like(store, monkeypatch):
+    monkeypatch.setattr(store, "has_fts", False)
+    total, results = store.search("REFUGE")
+    assert total == 3
+    assert refs(results) == [(112, 2), (113, 1), (114, 1)]
+    assert store.search("refuge", surah=113)[0] == 1
+    assert store.search("100%")[0] == 0
+
+
+def test_fts_query_or():
+    assert quran_store.fts_query("daybreak OR jinn") == '("daybreak") OR ("jinn")'
+    assert quran_store.fts_query("OR lord") == '"lord"'
+
+
+def test_search_arabic_without_marks(store):
+    _, results = store.search("الرحمن الرحيم")
+    assert {(1, 1), (1, 3)} <= set(refs(results))
+
+
+def test_texts_come_from_corpus(store):
+    assert store.corpus is not None
+    assert store.corpus.version == store.version
+    assert store.texts(6222)[1] == store.surah(112)["ayahs"][0]["translation"]
+    assert store.texts(99999) == ("", "")
+
+
+def test_ayah_range(store):
+    ayahs = store.ayahs(113, 2, 4)
+    assert [ayah["numberInSurah"] for ayah in ayahs] == [2, 3, 4]
+    assert ayahs[0] == store.surah(113)["ayahs"][1]
+    assert [ayah["numberInSurah"] for ayah in store.ayahs(112, 3, 99)] == [3, 4]
+    assert store.ayahs(112, 5, 9) is None
+    assert store.ayahs(112, 3, 2) is None
+    assert store.ayahs(2, 1, 1) is None
+
+
+def test_search_marks_matches(store, monkeypatch):
+    marked = f"{MARK_START}Refuge{MARK_END}"
+    _, results = store.search("refuge", surah=112)
+    assert marked in results[0]["marked"]
+    monkeypatch.setattr(store, "has_fts", False)
+    _, results = store.search("refuge", surah=112)
+    assert marked in results[0]["marked"]
+
+
+def test_results_keep_the_given_order(store, monkeypatch):
+    results = store.results([6236, 6222], {6222: "marked"})
+    assert [(r["surah_number"], r["ayah_number"]) for r in results] == [(114, 6), (112, 1)]
+    assert results[0]["marked"] == results[0]["translation"]
+    assert results[1]["marked"] == "marked"
+    # Texts come from the corpus; without it they are read from SQLite
+    from_corpus = store.results([6236, 6222])
+    monkeypatch.setattr(store, "corpus", None)
+    assert store.results([6236, 6222]) == from_corpus
+
+
+def test_search_offset_past_the_end(store, monkeypatch):
+    assert store.search("refuge", offset=10**20) == (3, [])
+    monkeypatch.setattr(store, "has_fts", False)
+    assert store.search("refuge", offset=10**20) == (3, [])
@@ -0,0 +1,48 @@
+import sys
+
+import pytest
+
+import surahs
+from surahs import Surah, SurahTable
+
+ROWS = [
+    {"number": 114, "name": "سورة الناس", "englishName": "An-Naas",
+     "englishNameTranslation": "Mankind", "revelationType": "Meccan", "numberOfAyahs": 6},
+    {"number": 1, "name": "سُورَةُ ٱلْفَاتِحَةِ", "englishName": "Al-Faatiha",
+     "englishNameTranslation": "The Opening", "revelationType": "Meccan", "numberOfAyahs": 7},
+]
+
+
+def test_table_lookup():
+    table = SurahTable.from_dicts(ROWS, "v1")
+    assert [surah.number for surah in table] == [1, 114]
+    assert table[114].englishName == "An-Naas"
+    assert table.get(2) is None and table.get(0) is None and table.get(500) is None
+    with pytest.raises(KeyError):
+        table[2]
+    assert table.as_dicts()[0] == ROWS[1]
+
+
+def test_records_are_read_only():
+    surah = SurahTable.from_dicts(ROWS)[1]
+    assert isinstance(surah, Surah)
+    with pytest.raises(AttributeError):
+        surah.englishName = "changed"
+
+
+def test_snapshot_round_trip(tmp_path, monkeypatch):
+    path = tmp_path / "surah_meta.py"
+    surahs.write_snapshot(SurahTable.from_dicts(ROWS, "v1"), str(path))
+    assert path.read_text(encoding="utf-8").startswith("# Generated by")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "surah_meta", raising=False)
+    table = surahs._load_bundled()
+    assert table.source == "bundled:v1"
+    assert table.as_dicts() == SurahTable.from_dicts(ROWS).as_dicts()
+    sys.modules.pop("surah_meta", None)
+
+
+def test_snapshot_needs_every_surah(client):
+    result = client.application.test_cli_runner().invoke(args=["snapshot-surahs"])
+    assert result.exit_code != 0
+    assert "Found 4 surahs instead of 114" in result.output
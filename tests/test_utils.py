@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from utils import atomic_file, env_float, env_int, write_atomic
+
+
+def test_env_numbers(monkeypatch):
+    monkeypatch.setenv("BRODEEN_TEST_INT", "12")
+    monkeypatch.setenv("BRODEEN_TEST_FLOAT", "nope")
+    assert env_int("BRODEEN_TEST_INT", 3) == 12
+    assert env_float("BRODEEN_TEST_FLOAT", 1.5) == 1.5
+    assert env_int("BRODEEN_TEST_UNSET", 7) == 7
+
+
+def test_write_atomic(tmp_path):
+    path = str(tmp_path / "nested" / "file.bin")
+    write_atomic(path, b"one")
+    write_atomic(path, b"two")
+    with open(path, "rb") as f:
+        assert f.read() == b"two"
+    assert os.listdir(tmp_path / "nested") == ["file.bin"]
+
+
+def test_atomic_file_keeps_the_old_file_on_failure(tmp_path):
+    path = str(tmp_path / "file.txt")
+    write_atomic(path, b"old")
+    with pytest.raises(RuntimeError):
+        with atomic_file(path, "w", encoding="utf-8") as f:
+            f.write("partial")
+            raise RuntimeError("interrupted")
+    with open(path, "rb") as f:
+        assert f.read() == b"old"
+    assert os.listdir(tmp_path) == ["file.txt"]
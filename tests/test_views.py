@@ -0,0 +1,126 @@
+def test_home_lists_surahs(client):
+    body = client.get("/").get_data(as_text=True)
+    assert "Al-Faatiha" in body and "An-Naas" in body
+
+
+def test_surah_page(client):
+    response = client.get("/surah/112")
+    assert response.status_code == 200
+    assert "Allah, the Eternal Refuge." in response.get_data(as_text=True)
+
+
+def test_search_page(client):
+    body = client.get("/search?q=refuge").get_data(as_text=True)
+    assert "Eternal" in body and "daybreak" in body
+
+
+def test_search_index_engine(client, monkeypatch):
+    monkeypatch.setitem(client.application.config, "SEARCH_ENGINE", "index")
+    body = client.get("/search?q=refuge").get_data(as_text=True)
+    assert "Eternal" in body and "daybreak" in body
+
+
+def test_surah_page_is_streamed(client):
+    response = client.get("/surah/113")
+    assert response.content_length is None
+    body = response.get_data(as_text=True)
+    assert body.count("daybreak") >= 1 and "</html>" in body
+
+
+def test_cached_surah_page_has_an_etag_after_the_miss(client):
+    client.get("/surah/113").get_data()
+    cached = client.get("/surah/113")
+    assert cached.content_length and cached.headers["ETag"]
+
+
+def test_surah_page_without_streaming(client, monkeypatch):
+    monkeypatch.setitem(client.application.config, "STREAM_PAGES", False)
+    monkeypatch.setitem(client.application.config, "PAGE_CACHE", False)
+    response = client.get("/surah/113")
+    assert response.content_length
+    assert "daybreak" in response.get_data(as_text=True)
+
+
+def test_lazy_surah(store):
+    surah = store.surah(112, lazy=True)
+    assert not isinstance(surah["ayahs"], list)
+    assert [ayah["numberInSurah"] for ayah in surah["ayahs"]] == [1, 2, 3, 4]
+
+
+def test_ayah_range_pages(client):
+    body = client.get("/surah/112/2-3").get_data(as_text=True)
+    assert "Eternal Refuge" in body
+    assert "[who is] One" not in body
+    assert "Eternal Refuge" in client.get("/ayah/112:2").get_data(as_text=True)
+    assert client.get("/surah/112/5-6").status_code == 404
+
+
+def test_ayah_range_api(client):
+    data = client.get("/api/surah/114/5-6").get_json()
+    assert data["number"] == 114
+    assert [ayah["numberInSurah"] for ayah in data["ayahs"]] == [5, 6]
+    assert client.get("/api/ayah/114:6").get_json()["ayahs"][0]["translation"].startswith("From among the jinn")
+    assert client.get("/api/ayah/2:1").status_code == 404
+
+
+def test_surahs_api(client):
+    assert [surah["number"] for surah in client.get("/api/surahs").get_json()] == [1, 112, 113, 114]
+
+
+def test_in_request_thread_runs_on_the_calling_thread():
+    import threading
+
+    from asgiref.sync import async_to_sync
+
+    import app
+
+    async def view():
+        return await app.in_request_thread(threading.get_ident)
+
+    assert async_to_sync(view)() == threading.get_ident()
+
+
+def test_search_highlights_matches_after_escaping(client):
+    body = client.get("/search?q=refuge").get_data(as_text=True)
+    assert '<span class="highlight">Refuge</span>' in body
+    assert "\x02" not in body and "\x03" not in body
+
+
+def test_api_search_highlights_the_english_text(store, monkeypatch):
+    from asgiref.sync import async_to_sync
+
+    import app
+    matches = [{"surah": {"number": 112}, "numberInSurah": 2, "text": "Allah, the Eternal Refuge."}]
+
+    async def fetch_quran_data(endpoint, params=None):
+        assert endpoint == "search"
+        return {"data": {"total": 1, "matches": matches}}
+
+    async def get_surah_table():
+        return store.surah_table
+
+    monkeypatch.setattr(app, "get_store", lambda: None)
+    monkeypatch.setattr(app, "fetch_quran_data", fetch_quran_data)
+    monkeypatch.setattr(app, "get_surah_table", get_surah_table)
+    total, results = async_to_sync(app.search_ayahs)("refuge", None, 0, 20)
+    assert total == 1
+    assert results[0]["text"] == ""
+    assert results[0]["translation"] == "Allah, the Eternal Refuge."
+    assert results[0]["marked"] == "Allah, the Eternal \x02Refuge\x03."
+    assert results[0]["surah_name"] == "Al-Ikhlaas"
+
+
+def test_search_ignores_invalid_surah_filters(client):
+    for surah in ("²", "0", "2", "99999999999999999999", "x"):
+        response = client.get(f"/search?q=refuge&surah={surah}")
+        assert response.status_code == 200
+        assert "Eternal" in response.get_data(as_text=True)
+    body = client.get("/search?q=refuge&surah=113").get_data(as_text=True)
+    assert "daybreak" in body and "Eternal" not in body
+
+
+def test_search_past_the_last_result(client):
+    for offset in ("20", "99999999999999999999"):
+        response = client.get(f"/search?q=refuge&offset={offset}")
+        assert response.status_code == 200
+        assert "No results found" in response.get_data(as_text=True)
@@ -0,0 +1,48 @@
+"""Small helpers shared by the caches and the on-disk writers."""
+import contextlib
+import os
+import threading
+
+
+def env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+@contextlib.contextmanager
+def atomic_path(path):
+    """Yield a temporary path next to ``path`` and move it into place when the
+    block succeeds, so readers see either the old file or the new one, never a
+    partial write. The temporary file is removed if the block fails."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
+@contextlib.contextmanager
+def atomic_file(path, mode="wb", **kwargs):
+    """Yield a file opened with ``mode`` that replaces ``path`` atomically on close."""
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, mode, **kwargs) as f:
+            yield f
+
+
+def write_atomic(path, data):
+    """Write the bytes ``data`` to ``path`` atomically (see ``atomic_path``)."""
+    with atomic_file(path) as f:
+        f.write(data)